@@ -256,6 +256,12 @@ class VoiceGuardInstaller:
             else:
                 self.logger.warning(f"Source file not found: {file_name}")
                 
+        # Tray status icons
+        icons_dir = source_dir / "icons"
+        if icons_dir.exists():
+            shutil.copytree(icons_dir, self.install_dir / "icons", dirs_exist_ok=True)
+            self.logger.info("Copied: icons")
+            
         # Create executable wrappers
         self.create_executables()
         
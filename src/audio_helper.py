@@ -353,6 +353,9 @@ class AudioHelperProcess:
         if hasattr(self, 'openrouter_client'):
             await self.openrouter_client.cleanup()
             
+        if hasattr(self, 'keyword_matcher'):
+            self.keyword_matcher.close()
+            
         if hasattr(self, 'system_tray'):
             self.system_tray.quit()
 
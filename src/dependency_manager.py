@@ -11,17 +11,156 @@ import subprocess
 import logging
 import warnings
 import platform
+import functools
+import re
+import time
+import importlib.util
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Any
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import tempfile
 import shutil
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from packaging import version
 from packaging.requirements import Requirement
 import pkg_resources
 
 
+# How long a successful validate_installation() result is reused (seconds)
+VALIDATION_CACHE_TTL = 60
+
+# Requirement line: package name plus optional version specifier
+_REQUIREMENT_LINE_RE = re.compile(r"^([A-Za-z0-9_.\-]+)\s*([><=~!].*)?$", re.MULTILINE)
+
+
+def _build_compatibility_matrix() -> Dict[str, Any]:
+    """Build package compatibility matrix"""
+    return {
+        "python_versions": {
+            "minimum": "3.8.0",
+            "maximum": "3.12.99",
+            "recommended": "3.11.0"
+        },
+        "windows_versions": {
+            "minimum": "10.0.19041",  # Windows 10 20H1
+            "supported": ["10", "11"]
+        },
+        "incompatible_combinations": [
+            {"pyqt6": ">=6.6.0", "pywin32": "<306"},
+            {"numpy": ">=2.0.0", "scipy": "<1.13.0"},
+            {"librosa": ">=0.10.0", "numpy": "<1.20.0"}
+        ],
+        "critical_packages": [
+            "pywin32", "pyqt6", "numpy", "scipy", "pyaudio",
+            "aiohttp", "cryptography", "psutil"
+        ],
+        "windows_specific": [
+            "pywin32", "pywin32-ctypes", "wmi", "pystray"
+        ]
+    }
+
+
+# Static compatibility matrix shared by all DependencyManager instances
+_COMPATIBILITY_MATRIX = _build_compatibility_matrix()
+
+# Default known good versions (as of July 2025)
+_DEFAULT_KNOWN_GOOD_VERSIONS = {
+    "numpy": "1.26.4",
+    "scipy": "1.13.1",
+    "pyaudio": "0.2.14",
+    "librosa": "0.10.2",
+    "webrtcvad": "2.0.10",
+    "speechrecognition": "3.10.4",
+    "aiohttp": "3.9.5",
+    "pyqt6": "6.7.1",
+    "pywin32": "306",
+    "psutil": "5.9.8",
+    "pillow": "10.4.0",
+    "cryptography": "42.0.8",
+    "pyyaml": "6.0.1",
+    "requests": "2.32.3",
+    "packaging": "24.1"
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _read_known_good_versions(cache_file: str, mtime: float) -> Dict[str, str]:
+    """Read known good versions from disk, cached per file modification time"""
+    with open(cache_file, 'r') as f:
+        return json.load(f)
+
+
+def clear_known_good_versions_cache():
+    """Drop the cached known good versions so the next load re-reads disk"""
+    _read_known_good_versions.cache_clear()
+
+
+@functools.lru_cache(maxsize=64)
+def _read_requirements(req_file: str, mtime_ns: int, size: int) -> Tuple[str, ...]:
+    """Read requirement lines from disk, cached per file path, mtime and size"""
+    packages = []
+    
+    with open(req_file, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and not line.startswith('-r'):
+                packages.append(line)
+                
+    return tuple(packages)
+
+
+def _fast_copy(src: Path, dst: Path):
+    """Hard-link src to dst on the same volume, falling back to a full copy"""
+    tmp = dst.with_name(dst.name + ".tmp")
+
+    try:
+        if tmp.exists():
+            tmp.unlink()
+        os.link(src, tmp)
+        os.replace(tmp, dst)
+    except OSError:
+        if tmp.exists():
+            tmp.unlink()
+        shutil.copy2(src, dst)
+
+
+def _module_available(module_name: str) -> bool:
+    """Check whether a module can be imported without executing it"""
+    if module_name in sys.modules:
+        return True
+
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        # Parent package missing or broken module spec
+        return False
+
+
+@functools.cache
+def _system_info() -> Dict[str, str]:
+    """Process-constant platform details (platform.platform() is slow on Windows)"""
+    return {
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "architecture": platform.architecture()[0],
+        "system": platform.system(),
+        "version": platform.version()
+    }
+
+
+def _probe_import(probe: Tuple[str, str]) -> Tuple[str, str, Optional[str]]:
+    """Probe a (module, package) pair, returning an error message if unavailable"""
+    module_name, package_name = probe
+
+    if _module_available(module_name):
+        return module_name, package_name, None
+
+    return module_name, package_name, "module not found"
+
+
 class DependencyManager:
     """Comprehensive dependency management for VoiceGuard"""
     
@@ -41,34 +180,35 @@ class DependencyManager:
         # Known good versions cache
         self.known_good_versions = self._load_known_good_versions()
         
+        # Last successful validation result: (monotonic timestamp, result)
+        self._validation_cache: Optional[Tuple[float, Tuple[bool, List[str]]]] = None
+        
+        # Pooled HTTP session for PyPI lookups
+        self._http = self._create_http_session()
+        
         # Setup warning handler
         self._setup_warning_handler()
         
+    def _create_http_session(self) -> requests.Session:
+        """Create HTTP session with connection pooling and retries"""
+        session = requests.Session()
+        session.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "User-Agent": "VoiceGuard-DepMgr/1.0"
+        })
+        
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 503])
+        session.mount("https://", HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=8,
+            max_retries=retry
+        ))
+        
+        return session
+        
     def _load_compatibility_matrix(self) -> Dict[str, Any]:
         """Load package compatibility matrix"""
-        return {
-            "python_versions": {
-                "minimum": "3.8.0",
-                "maximum": "3.12.99",
-                "recommended": "3.11.0"
-            },
-            "windows_versions": {
-                "minimum": "10.0.19041",  # Windows 10 20H1
-                "supported": ["10", "11"]
-            },
-            "incompatible_combinations": [
-                {"pyqt6": ">=6.6.0", "pywin32": "<306"},
-                {"numpy": ">=2.0.0", "scipy": "<1.13.0"},
-                {"librosa": ">=0.10.0", "numpy": "<1.20.0"}
-            ],
-            "critical_packages": [
-                "pywin32", "pyqt6", "numpy", "scipy", "pyaudio",
-                "aiohttp", "cryptography", "psutil"
-            ],
-            "windows_specific": [
-                "pywin32", "pywin32-ctypes", "wmi", "pystray"
-            ]
-        }
+        return _COMPATIBILITY_MATRIX
         
     def _load_known_good_versions(self) -> Dict[str, str]:
         """Load known good package versions"""
@@ -76,29 +216,12 @@ class DependencyManager:
         
         if cache_file.exists():
             try:
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+                mtime = cache_file.stat().st_mtime
+                return dict(_read_known_good_versions(str(cache_file), mtime))
             except Exception as e:
                 self.logger.warning(f"Failed to load known good versions: {e}")
                 
-        # Default known good versions (as of July 2025)
-        return {
-            "numpy": "1.26.4",
-            "scipy": "1.13.1",
-            "pyaudio": "0.2.14",
-            "librosa": "0.10.2",
-            "webrtcvad": "2.0.10",
-            "speechrecognition": "3.10.4",
-            "aiohttp": "3.9.5",
-            "pyqt6": "6.7.1",
-            "pywin32": "306",
-            "psutil": "5.9.8",
-            "pillow": "10.4.0",
-            "cryptography": "42.0.8",
-            "pyyaml": "6.0.1",
-            "requests": "2.32.3",
-            "packaging": "24.1"
-        }
+        return dict(_DEFAULT_KNOWN_GOOD_VERSIONS)
         
     def _setup_warning_handler(self):
         """Setup comprehensive warning handling"""
@@ -157,8 +280,10 @@ class DependencyManager:
         """Check system compatibility requirements"""
         issues = []
         
+        system_info = _system_info()
+        
         # Check Python version
-        python_ver = platform.python_version()
+        python_ver = system_info["python_version"]
         min_ver = self.compatibility_matrix["python_versions"]["minimum"]
         max_ver = self.compatibility_matrix["python_versions"]["maximum"]
         
@@ -168,56 +293,58 @@ class DependencyManager:
             issues.append(f"Python {python_ver} is above maximum tested {max_ver}")
             
         # Check Windows version
-        if platform.system() == "Windows":
-            win_ver = platform.version()
+        if system_info["system"] == "Windows":
+            win_ver = system_info["version"]
             min_win_ver = self.compatibility_matrix["windows_versions"]["minimum"]
             
             if version.parse(win_ver) < version.parse(min_win_ver):
                 issues.append(f"Windows {win_ver} is below minimum {min_win_ver}")
                 
         # Check architecture
-        if platform.architecture()[0] != "64bit":
+        if system_info["architecture"] != "64bit":
             issues.append("64-bit architecture required")
             
         return len(issues) == 0, issues
         
     def get_latest_versions(self, packages: List[str]) -> Dict[str, Optional[str]]:
         """Get latest compatible versions from PyPI"""
-        latest_versions = {}
-        
-        for package in packages:
-            try:
-                # Clean package name (remove version specifiers)
-                clean_name = package.split('>=')[0].split('==')[0].split('<')[0].strip()
-                
-                # Check PyPI for latest version
-                response = requests.get(
-                    f"https://pypi.org/pypi/{clean_name}/json",
-                    timeout=10
-                )
+        if len(packages) <= 1:
+            return dict(self._fetch_latest_version(package) for package in packages)
+            
+        # Lookups are network bound; run them concurrently over the pooled session
+        with ThreadPoolExecutor(max_workers=min(8, len(packages))) as executor:
+            return dict(executor.map(self._fetch_latest_version, packages))
+            
+    def _fetch_latest_version(self, package: str) -> Tuple[str, Optional[str]]:
+        """Look up the latest compatible version of one package on PyPI"""
+        try:
+            # Clean package name (remove version specifiers)
+            clean_name = package.split('>=')[0].split('==')[0].split('<')[0].strip()
+            
+            # Check PyPI for latest version
+            response = self._http.get(
+                f"https://pypi.org/pypi/{clean_name}/json",
+                timeout=10
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                latest_version = data['info']['version']
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    latest_version = data['info']['version']
+                # Validate compatibility
+                if self._is_version_compatible(clean_name, latest_version):
+                    return clean_name, latest_version
                     
-                    # Validate compatibility
-                    if self._is_version_compatible(clean_name, latest_version):
-                        latest_versions[clean_name] = latest_version
-                    else:
-                        # Use known good version
-                        latest_versions[clean_name] = self.known_good_versions.get(
-                            clean_name, latest_version
-                        )
-                else:
-                    self.logger.warning(f"Could not fetch version for {clean_name}")
-                    latest_versions[clean_name] = None
-                    
-            except Exception as e:
-                self.logger.error(f"Error checking version for {package}: {e}")
-                latest_versions[package] = None
+                # Use known good version
+                return clean_name, self.known_good_versions.get(clean_name, latest_version)
                 
-        return latest_versions
-        
+            self.logger.warning(f"Could not fetch version for {clean_name}")
+            return clean_name, None
+            
+        except Exception as e:
+            self.logger.error(f"Error checking version for {package}: {e}")
+            return package, None
+            
     def _is_version_compatible(self, package: str, version_str: str) -> bool:
         """Check if a package version is compatible"""
         try:
@@ -272,9 +399,10 @@ class DependencyManager:
                 packages = self._parse_requirements_file(req_file)
                 all_packages.extend(packages)
                 
-        # Get latest versions
-        package_names = [pkg.split('>=')[0].split('==')[0].split('<')[0].strip() 
-                        for pkg in all_packages]
+        # Get latest versions, once per package even if listed in several files
+        package_names = list(dict.fromkeys(
+            pkg.split('>=')[0].split('==')[0].split('<')[0].strip() for pkg in all_packages
+        ))
         latest_versions = self.get_latest_versions(package_names)
         
         # Check for updates
@@ -308,19 +436,13 @@ class DependencyManager:
         
     def _parse_requirements_file(self, req_file: Path) -> List[str]:
         """Parse requirements file and return package list"""
-        packages = []
-        
         try:
-            with open(req_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and not line.startswith('-r'):
-                        packages.append(line)
-                        
+            stat = req_file.stat()
+            return list(_read_requirements(str(req_file), stat.st_mtime_ns, stat.st_size))
+            
         except Exception as e:
             self.logger.error(f"Error parsing {req_file}: {e}")
-            
-        return packages
+            return []
         
     def _check_package_incompatibilities(self, versions: Dict[str, str]) -> List[Dict[str, str]]:
         """Check for package incompatibilities"""
@@ -381,7 +503,7 @@ class DependencyManager:
             for req_file in ["requirements.txt", "requirements-dev.txt"]:
                 source = self.project_root / req_file
                 if source.exists():
-                    shutil.copy2(source, backup_path / req_file)
+                    _fast_copy(source, backup_path / req_file)
 
             # Backup installed packages list
             installed_packages = self._get_installed_packages()
@@ -418,15 +540,15 @@ class DependencyManager:
             if not backup_path:
                 backup_path = self.backup_current_configuration()
 
-            # Update requirements.txt
-            req_file = self.project_root / "requirements.txt"
-            if req_file.exists():
-                self._update_single_requirements_file(req_file, updates)
+            # Update requirements.txt and requirements-dev.txt
+            req_files = [
+                self.project_root / name
+                for name in ("requirements.txt", "requirements-dev.txt")
+                if (self.project_root / name).exists()
+            ]
 
-            # Update requirements-dev.txt
-            req_dev_file = self.project_root / "requirements-dev.txt"
-            if req_dev_file.exists():
-                self._update_single_requirements_file(req_dev_file, updates)
+            for req_file in req_files:
+                self._update_single_requirements_file(req_file, updates)
 
             # Update known good versions
             self.known_good_versions.update(updates)
@@ -439,32 +561,32 @@ class DependencyManager:
             self.logger.error(f"Failed to update requirements files: {e}")
             return False
 
-    def _update_single_requirements_file(self, req_file: Path, updates: Dict[str, str]):
-        """Update a single requirements file"""
-        lines = []
+    def _update_single_requirements_file(self, req_file: Path, updates: Dict[str, str]) -> bool:
+        """Update a single requirements file, returning True if it changed"""
+        def replace_requirement(match: re.Match) -> str:
+            package_name = match.group(1)
+            new_version = updates.get(package_name.lower())
 
-        with open(req_file, 'r') as f:
-            for line in f:
-                original_line = line.strip()
+            if new_version is None:
+                return match.group(0)
 
-                if original_line and not original_line.startswith('#'):
-                    # Extract package name
-                    package_name = original_line.split('>=')[0].split('==')[0].split('<')[0].strip()
+            new_line = f"{package_name}>={new_version}"
+            self.logger.debug(f"Updated {package_name}: {match.group(0)} -> {new_line}")
+            return new_line
 
-                    if package_name.lower() in updates:
-                        # Update version
-                        new_version = updates[package_name.lower()]
-                        new_line = f"{package_name}>={new_version}"
-                        lines.append(new_line + '\n')
-                        self.logger.debug(f"Updated {package_name}: {original_line} -> {new_line}")
-                    else:
-                        lines.append(line)
-                else:
-                    lines.append(line)
+        text = req_file.read_text()
+        new_text = _REQUIREMENT_LINE_RE.sub(replace_requirement, text)
 
-        # Write updated file
-        with open(req_file, 'w') as f:
-            f.writelines(lines)
+        # Leave the file (and its mtime) alone when nothing changed
+        if new_text == text:
+            return False
+
+        # Write to a new file and swap it in; backups may be hard links to
+        # the current file and must not be modified in place
+        tmp_file = req_file.with_name(req_file.name + ".tmp")
+        tmp_file.write_text(new_text)
+        os.replace(tmp_file, req_file)
+        return True
 
     def _save_known_good_versions(self):
         """Save known good versions to cache"""
@@ -475,6 +597,8 @@ class DependencyManager:
                 json.dump(self.known_good_versions, f, indent=2)
         except Exception as e:
             self.logger.error(f"Failed to save known good versions: {e}")
+        finally:
+            clear_known_good_versions_cache()
 
     def rollback_to_backup(self, backup_path: Path) -> bool:
         """Rollback to a previous backup configuration"""
@@ -487,7 +611,7 @@ class DependencyManager:
                 target_file = self.project_root / req_file
 
                 if backup_file.exists():
-                    shutil.copy2(backup_file, target_file)
+                    _fast_copy(backup_file, target_file)
                     self.logger.info(f"Restored {req_file}")
 
             # Restore known good versions
@@ -588,7 +712,7 @@ class DependencyManager:
                     issues.append(f"Critical package {package} not installed")
 
             # Check Windows-specific packages on Windows
-            if platform.system() == "Windows":
+            if _system_info()["system"] == "Windows":
                 for package in self.compatibility_matrix["windows_specific"]:
                     try:
                         pkg_resources.get_distribution(package)
@@ -604,25 +728,42 @@ class DependencyManager:
                 ("pyaudio", "PyAudio")
             ]
 
-            for module_name, package_name in critical_imports:
-                try:
-                    __import__(module_name)
-                except ImportError as e:
-                    issues.append(f"Cannot import {module_name} from {package_name}: {e}")
+            with ThreadPoolExecutor(max_workers=len(critical_imports)) as executor:
+                probe_results = list(executor.map(_probe_import, critical_imports))
+
+            for module_name, package_name, error in probe_results:
+                if error:
+                    issues.append(f"Cannot import {module_name} from {package_name}: {error}")
 
         except Exception as e:
             issues.append(f"Validation error: {e}")
 
         return len(issues) == 0, issues
 
+    def _cached_validate_installation(self) -> Tuple[bool, List[str]]:
+        """Run validate_installation, reusing a recent successful result"""
+        now = time.monotonic()
+
+        if self._validation_cache:
+            timestamp, (validation_ok, issues) = self._validation_cache
+            if now - timestamp < VALIDATION_CACHE_TTL:
+                return validation_ok, list(issues)
+
+        validation_ok, issues = self.validate_installation()
+        if validation_ok:
+            self._validation_cache = (now, (validation_ok, list(issues)))
+
+        return validation_ok, issues
+
     def get_dependency_status(self) -> Dict[str, Any]:
         """Get comprehensive dependency status report"""
+        system_info = _system_info()
         status = {
             'timestamp': datetime.now().isoformat(),
             'system_info': {
-                'python_version': platform.python_version(),
-                'platform': platform.platform(),
-                'architecture': platform.architecture()[0]
+                'python_version': system_info['python_version'],
+                'platform': system_info['platform'],
+                'architecture': system_info['architecture']
             },
             'validation_status': {},
             'installed_packages': {},
@@ -631,7 +772,7 @@ class DependencyManager:
         }
 
         # Validation status
-        validation_ok, validation_issues = self.validate_installation()
+        validation_ok, validation_issues = self._cached_validate_installation()
         status['validation_status'] = {
             'passed': validation_ok,
             'issues': validation_issues
@@ -708,21 +849,23 @@ class DependencyManager:
         try:
             cutoff_date = datetime.now() - timedelta(days=days_to_keep)
 
-            # Clean old backups
-            for backup_dir in self.backup_dir.iterdir():
-                if backup_dir.is_dir():
-                    try:
-                        # Extract timestamp from directory name
-                        timestamp_str = backup_dir.name.split('_')[-2] + '_' + backup_dir.name.split('_')[-1]
-                        backup_date = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
+            # Clean old backups (age from directory mtime, removed in parallel)
+            cutoff_ts = cutoff_date.timestamp()
+            old_backups = [
+                backup_dir for backup_dir in self.backup_dir.iterdir()
+                if backup_dir.is_dir() and backup_dir.stat().st_mtime < cutoff_ts
+            ]
 
-                        if backup_date < cutoff_date:
-                            shutil.rmtree(backup_dir)
-                            self.logger.info(f"Removed old backup: {backup_dir.name}")
+            if old_backups:
+                with ThreadPoolExecutor(max_workers=4) as executor:
+                    for backup_dir in old_backups:
+                        executor.submit(shutil.rmtree, backup_dir, ignore_errors=True)
 
-                    except (ValueError, IndexError):
-                        # Skip directories that don't match expected format
-                        continue
+                for backup_dir in old_backups:
+                    if backup_dir.exists():
+                        self.logger.warning(f"Failed to remove old backup: {backup_dir.name}")
+                    else:
+                        self.logger.info(f"Removed old backup: {backup_dir.name}")
 
             # Clean old warnings
             warnings_file = self.cache_dir / "deprecation_warnings.json"
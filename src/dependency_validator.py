@@ -7,14 +7,143 @@ Integration points for dependency management across VoiceGuard components
 import sys
 import logging
 import asyncio
+import functools
+import importlib.util
+import threading
+import time
+from collections import namedtuple
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Callable
 from datetime import datetime
 import json
+import os
+from collections import deque
+
+from packaging.version import Version, InvalidVersion
 
 from dependency_manager import DependencyManager
 
 
+# How long validation results are reused (seconds)
+VALIDATION_CACHE_TTL = 60
+
+# Validation history is kept as newline-delimited JSON, compacted to this many records
+VALIDATION_HISTORY_LIMIT = 100
+VALIDATION_HISTORY_FILE = "validation_history.ndjson"
+
+# PortAudio init/teardown is slow; device enumeration is reused this long (seconds)
+AUDIO_DEVICE_CACHE_TTL = 30
+
+_pa_cache = {'ts': None, 'result': None}
+
+# Input devices as parallel tuples of PyAudio index, name and channel count
+InputDevices = namedtuple('InputDevices', 'indices names channels')
+
+_CacheEntry = namedtuple('_CacheEntry', 'expiry,value')
+
+
+def _requirements_key(requirements_files: List[Path]) -> Tuple:
+    """Cache key for requirements files that changes when any file changes"""
+    return tuple(sorted(
+        (str(path), path.stat().st_mtime if path.exists() else None)
+        for path in requirements_files
+    ))
+
+
+@functools.lru_cache(maxsize=512)
+def _parse_version(version_str: str) -> Version:
+    """Parse a version string, memoized since reports compare the same versions repeatedly"""
+    return Version(version_str)
+
+
+def _module_available(module_name: str) -> bool:
+    """Check whether a module can be imported without importing it"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def probe_input_devices() -> Tuple[InputDevices, Optional[str]]:
+    """Enumerate PyAudio input devices, reusing a successful result for AUDIO_DEVICE_CACHE_TTL"""
+    cached_at = _pa_cache['ts']
+    if cached_at is not None and time.monotonic() - cached_at < AUDIO_DEVICE_CACHE_TTL:
+        return _pa_cache['result']
+        
+    result = _enumerate_input_devices()
+    if result[1] is None:
+        _pa_cache['result'] = result
+        _pa_cache['ts'] = time.monotonic()
+    return result
+
+
+def _clear_input_device_cache():
+    """Force the next device probe to re-initialize PortAudio"""
+    _pa_cache['ts'] = None
+
+
+def _enumerate_input_devices() -> Tuple[InputDevices, Optional[str]]:
+    """Enumerate PyAudio input devices, returning (devices, error)"""
+    indices, names, channels = [], [], []
+    try:
+        import pyaudio
+        audio = pyaudio.PyAudio()
+        
+        try:
+            for i in range(audio.get_device_count()):
+                device_info = audio.get_device_info_by_index(i)
+                if device_info['maxInputChannels'] > 0:
+                    indices.append(i)
+                    names.append(device_info['name'])
+                    channels.append(device_info['maxInputChannels'])
+        finally:
+            audio.terminate()
+            
+        return InputDevices(tuple(indices), tuple(names), tuple(channels)), None
+        
+    except Exception as e:
+        return InputDevices((), (), ()), str(e)
+
+
+def ttl_cache(seconds: float = VALIDATION_CACHE_TTL,
+              key_func: Optional[Callable[..., Any]] = None):
+    """Memoize a DependencyValidator method in its validation_cache for `seconds`"""
+    def decorator(func):
+        def make_key(args, kwargs):
+            if key_func:
+                return func.__name__, key_func(*args, **kwargs)
+            return func.__name__, args, tuple(sorted(kwargs.items()))
+            
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                key = make_key(args, kwargs)
+                entry = self._get_cached_result(key)
+                if entry is not None:
+                    return entry.value
+                    
+                result = await func(self, *args, **kwargs)
+                self._store_cached_result(key, result, seconds)
+                return result
+                
+            return async_wrapper
+            
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            key = make_key(args, kwargs)
+            entry = self._get_cached_result(key)
+            if entry is not None:
+                return entry.value
+                
+            result = func(self, *args, **kwargs)
+            self._store_cached_result(key, result, seconds)
+            return result
+            
+        return wrapper
+        
+    return decorator
+
+
 class DependencyValidator:
     """Dependency validation integration for VoiceGuard components"""
     
@@ -23,7 +152,34 @@ class DependencyValidator:
         self.dependency_manager = DependencyManager()
         self.validation_cache = {}
         self.last_validation_time = None
+        self._cache_lock = threading.Lock()
+        self._history_appends = 0
+        
+        # Strong references to background tasks so they are not garbage collected
+        self._bg_tasks = set()
+        self._update_in_flight = False
         
+    def _get_cached_result(self, key) -> Optional[_CacheEntry]:
+        """Return the cache entry for key if it has not expired"""
+        with self._cache_lock:
+            entry = self.validation_cache.get(key)
+            if entry is not None and entry.expiry > time.monotonic():
+                return entry
+            return None
+            
+    def _store_cached_result(self, key, value, ttl: float):
+        """Store a validation result in the cache"""
+        with self._cache_lock:
+            self.validation_cache[key] = _CacheEntry(time.monotonic() + ttl, value)
+            self.last_validation_time = datetime.now()
+            
+    def clear_validation_cache(self):
+        """Forget all cached validation results"""
+        with self._cache_lock:
+            self.validation_cache.clear()
+        _clear_input_device_cache()
+            
+    @ttl_cache()
     async def validate_for_service_startup(self) -> Tuple[bool, Dict[str, Any]]:
         """Validate dependencies before service startup"""
         self.logger.info("Validating dependencies for service startup...")
@@ -57,8 +213,12 @@ class DependencyValidator:
             if not system_ok:
                 self.logger.warning(f"System compatibility issues: {system_issues}")
                 
-            # Automated update check (non-blocking)
-            asyncio.create_task(self._background_update_check())
+            # Automated update check (non-blocking), at most one at a time
+            if not self._update_in_flight:
+                self._update_in_flight = True
+                task = asyncio.create_task(self._background_update_check())
+                self._bg_tasks.add(task)
+                task.add_done_callback(self._bg_tasks.discard)
             
             return True, {
                 'status': 'validated',
@@ -82,7 +242,12 @@ class DependencyValidator:
         """Background update check (non-blocking)"""
         try:
             self.logger.debug("Running background dependency update check...")
-            success, results = self.dependency_manager.automated_update_check()
+            
+            # The check does blocking network I/O; keep it off the event loop
+            loop = asyncio.get_running_loop()
+            success, results = await loop.run_in_executor(
+                None, self.dependency_manager.automated_update_check
+            )
             
             if not success:
                 self.logger.warning("Background update check found issues")
@@ -95,26 +260,26 @@ class DependencyValidator:
         except Exception as e:
             self.logger.debug(f"Background update check failed: {e}")
             
+        finally:
+            self._update_in_flight = False
+            
+    @ttl_cache()
     def validate_for_gui_startup(self) -> Tuple[bool, Dict[str, Any]]:
         """Validate dependencies for GUI startup"""
         self.logger.info("Validating dependencies for GUI startup...")
         
         try:
             # Check GUI-specific dependencies
-            gui_packages = ['PyQt6', 'pillow']
+            gui_packages = {
+                'PyQt6': ['PyQt6.QtWidgets', 'PyQt6.QtCore', 'PyQt6.QtGui'],
+                'pillow': ['PIL.Image', 'PIL.ImageDraw']
+            }
             gui_issues = []
             
-            for package in gui_packages:
-                try:
-                    if package == 'PyQt6':
-                        import PyQt6.QtWidgets
-                        import PyQt6.QtCore
-                        import PyQt6.QtGui
-                    elif package == 'pillow':
-                        from PIL import Image, ImageDraw
-                        
-                except ImportError as e:
-                    gui_issues.append(f"GUI dependency {package} import failed: {e}")
+            for package, modules in gui_packages.items():
+                missing = [name for name in modules if not _module_available(name)]
+                if missing:
+                    gui_issues.append(f"GUI dependency {package} not found: {', '.join(missing)}")
                     
             if gui_issues:
                 return False, {
@@ -138,6 +303,7 @@ class DependencyValidator:
                 'error': str(e)
             }
             
+    @ttl_cache()
     def validate_for_audio_processing(self) -> Tuple[bool, Dict[str, Any]]:
         """Validate dependencies for audio processing"""
         self.logger.info("Validating dependencies for audio processing...")
@@ -145,7 +311,7 @@ class DependencyValidator:
         try:
             # Check audio-specific dependencies
             audio_packages = {
-                'pyaudio': 'PyAudio',
+                'pyaudio': 'pyaudio',
                 'numpy': 'numpy',
                 'scipy': 'scipy.signal',
                 'librosa': 'librosa',
@@ -155,31 +321,20 @@ class DependencyValidator:
             audio_issues = []
             
             for package, import_name in audio_packages.items():
-                try:
-                    __import__(import_name)
-                except ImportError as e:
-                    audio_issues.append(f"Audio dependency {package} import failed: {e}")
+                if not _module_available(import_name):
+                    audio_issues.append(f"Audio dependency {package} not found")
                     
             # Test PyAudio specifically
-            try:
-                import pyaudio
-                audio = pyaudio.PyAudio()
-                
-                # Check for available input devices
-                input_devices = []
-                for i in range(audio.get_device_count()):
-                    device_info = audio.get_device_info_by_index(i)
-                    if device_info['maxInputChannels'] > 0:
-                        input_devices.append(device_info)
-                        
-                audio.terminate()
+            input_devices = 0
+            if _module_available('pyaudio'):
+                devices, device_error = probe_input_devices()
+                input_devices = len(devices.indices)
                 
-                if not input_devices:
+                if device_error:
+                    audio_issues.append(f"PyAudio device check failed: {device_error}")
+                elif not input_devices:
                     audio_issues.append("No audio input devices found")
                     
-            except Exception as e:
-                audio_issues.append(f"PyAudio device check failed: {e}")
-                
             if audio_issues:
                 return False, {
                     'status': 'audio_dependencies_failed',
@@ -188,7 +343,7 @@ class DependencyValidator:
                 
             return True, {
                 'status': 'validated',
-                'audio_devices_found': len(input_devices) if 'input_devices' in locals() else 0
+                'audio_devices_found': input_devices
             }
             
         except Exception as e:
@@ -198,6 +353,7 @@ class DependencyValidator:
                 'error': str(e)
             }
             
+    @ttl_cache(key_func=_requirements_key)
     def validate_for_installation(self, requirements_files: List[Path]) -> Tuple[bool, Dict[str, Any]]:
         """Validate dependencies before installation"""
         self.logger.info("Running pre-installation dependency validation...")
@@ -277,21 +433,27 @@ class DependencyValidator:
             
     def _get_validation_history(self) -> List[Dict[str, Any]]:
         """Get recent validation history"""
-        history_file = self.dependency_manager.cache_dir / "validation_history.json"
+        history_file = self.dependency_manager.cache_dir / VALIDATION_HISTORY_FILE
         
         try:
             if history_file.exists():
-                with open(history_file, 'r') as f:
-                    history = json.load(f)
-                    
                 # Return last 10 validations
-                return history[-10:] if len(history) > 10 else history
+                with open(history_file, 'r') as f:
+                    return [json.loads(line) for line in deque(f, maxlen=10) if line.strip()]
                 
         except Exception as e:
             self.logger.debug(f"Could not load validation history: {e}")
             
         return []
         
+    def _version_older(self, current: str, target: str) -> bool:
+        """Check whether version current is older than target"""
+        try:
+            return _parse_version(current) < _parse_version(target)
+        except InvalidVersion:
+            self.logger.warning(f"Could not parse versions {current!r} / {target!r}, comparing as strings")
+            return current < target
+            
     def _get_validation_recommendations(self, status: Dict[str, Any]) -> List[str]:
         """Generate validation-specific recommendations"""
         recommendations = []
@@ -309,7 +471,7 @@ class DependencyValidator:
         system_info = status.get('system_info', {})
         python_version = system_info.get('python_version', '')
         
-        if python_version and python_version < '3.11.0':
+        if python_version and self._version_older(python_version, '3.11.0'):
             recommendations.append("Consider upgrading to Python 3.11+ for better performance and security")
             
         # Check for critical package updates
@@ -321,7 +483,7 @@ class DependencyValidator:
                 current_version = installed_packages[package]
                 known_good = self.dependency_manager.known_good_versions.get(package)
                 
-                if known_good and current_version < known_good:
+                if known_good and self._version_older(current_version, known_good):
                     recommendations.append(f"Update {package} from {current_version} to {known_good}")
                     
         return recommendations
@@ -329,7 +491,7 @@ class DependencyValidator:
     def record_validation_result(self, component: str, success: bool, details: Dict[str, Any]):
         """Record validation result for history tracking"""
         try:
-            history_file = self.dependency_manager.cache_dir / "validation_history.json"
+            history_file = self.dependency_manager.cache_dir / VALIDATION_HISTORY_FILE
             
             validation_record = {
                 'timestamp': datetime.now().isoformat(),
@@ -338,25 +500,26 @@ class DependencyValidator:
                 'details': details
             }
             
-            # Load existing history
-            history = []
-            if history_file.exists():
-                with open(history_file, 'r') as f:
-                    history = json.load(f)
-                    
-            # Add new record
-            history.append(validation_record)
-            
-            # Keep only last 100 records
-            if len(history) > 100:
-                history = history[-100:]
-                
-            # Save updated history
-            with open(history_file, 'w') as f:
-                json.dump(history, f, indent=2)
+            # Compact on the first write and then every VALIDATION_HISTORY_LIMIT writes
+            if self._history_appends % VALIDATION_HISTORY_LIMIT == 0 and history_file.exists():
+                self._compact_validation_history(history_file)
                 
+            with open(history_file, 'a') as f:
+                f.write(json.dumps(validation_record, default=str) + '\n')
+            self._history_appends += 1
+            
         except Exception as e:
             self.logger.debug(f"Could not record validation result: {e}")
+            
+    def _compact_validation_history(self, history_file: Path):
+        """Trim the history file to the last VALIDATION_HISTORY_LIMIT records"""
+        with open(history_file, 'r') as f:
+            recent = deque(f, maxlen=VALIDATION_HISTORY_LIMIT)
+            
+        tmp_file = history_file.with_name(history_file.name + '.tmp')
+        with open(tmp_file, 'w') as f:
+            f.writelines(recent)
+        os.replace(tmp_file, history_file)
 
 
 # Global validator instance
@@ -6,15 +6,107 @@ Comprehensive event logging system for VoiceGuard
 
 import logging
 import logging.handlers
+import copy
 import json
+import os
 import sqlite3
+import queue
+import time
 import win32evtlog
 import win32evtlogutil
 import win32con
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Iterator, Tuple
 import threading
+import atexit
+from dataclasses import dataclass
+
+
+# Compact JSON; structured log lines splice pre-serialized payloads in these
+_JSON_SEPARATORS = (',', ':')
+
+# Prepared once; rows are written in batches by the writer thread
+_INSERT_EVENT_SQL = """
+    INSERT INTO event_log (event_type, event_data, confidence_score, timestamp)
+    VALUES (?, ?, ?, ?)
+"""
+
+
+def _adapt_json(value: Dict) -> str:
+    """Bind dicts as compact JSON text"""
+    return json.dumps(value, separators=_JSON_SEPARATORS, default=str)
+
+
+# Fallback for _log_to_database callers without a pre-serialized payload; the
+# current caller always passes one. sqlite3 adapters are process-global, so
+# this also changes how dicts bind for every other sqlite3 user in the process
+sqlite3.register_adapter(dict, _adapt_json)
+
+# Writer thread batching: flush after this many rows or this many seconds
+_WRITE_BATCH_SIZE = 128
+_WRITE_BATCH_TIMEOUT = 0.05
+_WRITE_QUEUE_SIZE = 10000
+
+# Old events are deleted in chunks of this many rows per transaction
+_CLEANUP_CHUNK_SIZE = 5000
+
+# How long get_event_statistics results are reused (seconds)
+_STATS_CACHE_TTL = 30
+
+# Identical events (category, id, message) seen more than _COALESCE_THRESHOLD
+# times within _COALESCE_WINDOW seconds are folded into one summary event
+_COALESCE_WINDOW = 5.0
+_COALESCE_THRESHOLD = 3
+_COALESCE_MAX_KEYS = 1024
+
+# Event IDs that are always mirrored to the Windows Event Log
+_CRITICAL_WIN_IDS = frozenset({2002, 1001, 1002})
+
+# Map severity to Windows event type
+_WIN_EVENT_TYPE = {
+    'High': win32evtlog.EVENTLOG_ERROR_TYPE,
+    'Medium': win32evtlog.EVENTLOG_WARNING_TYPE,
+    'Low': win32evtlog.EVENTLOG_INFORMATION_TYPE
+}
+
+
+@dataclass(frozen=True, slots=True)
+class EventMeta:
+    """Static metadata for a known event ID"""
+    category: str
+    name: str
+    severity: str
+    retention_days: int
+    win_event_type: int
+
+
+# Formats tracebacks for records handed to the log listener thread
+_EXC_FORMATTER = logging.Formatter()
+
+# Queue sentinel asking the writer thread to exit
+_STOP_WRITER = object()
+
+# Last formatted timestamp as (epoch milliseconds, ISO string); replaced as a
+# whole so concurrent readers never see a mismatched pair
+_ts_cache = (0, "")
+
+
+def _iso_timestamp(epoch_seconds: float) -> str:
+    """Format a UTC timestamp at millisecond resolution, reusing the last result"""
+    global _ts_cache
+    epoch_ms = int(epoch_seconds * 1000)
+    cached = _ts_cache
+    if cached[0] != epoch_ms:
+        cached = (epoch_ms, datetime.fromtimestamp(epoch_ms / 1000, timezone.utc)
+                  .isoformat(timespec='milliseconds'))
+        _ts_cache = cached
+    return cached[1]
+
+
+def _now_iso() -> str:
+    """Current UTC time as an ISO string"""
+    return _iso_timestamp(time.time())
 
 
 class EventLogger:
@@ -25,6 +117,33 @@ class EventLogger:
         self.db_path = Path("C:/ProgramData/VoiceGuard/config.db")
         self.log_lock = threading.Lock()
         
+        # One long-lived connection shared by the writer thread and readers
+        self._conn = None
+        self._conn_lock = threading.RLock()
+        self._log_listener = None
+        
+        # Minimum level of events persisted to the database
+        self.db_min_level = logging.INFO
+        
+        # Database writes are queued and committed in batches off the caller's thread
+        self._write_q = queue.Queue(maxsize=_WRITE_QUEUE_SIZE)
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop, name="EventLogWriter", daemon=True
+        )
+        self._writer_thread.start()
+        
+        # days -> (expiry, statistics)
+        self._stats_cache = {}
+        
+        # (category, event_id, message) -> [seen, suppressed, window_start, level, context]
+        self._coalesce = {}
+        self._coalesce_lock = threading.Lock()
+        self._coalesce_stop = threading.Event()
+        self._coalesce_thread = threading.Thread(
+            target=self._coalesce_loop, name="EventLogCoalescer", daemon=True
+        )
+        self._coalesce_thread.start()
+        
         # Event categories and IDs
         self.event_categories = {
             'security': {
@@ -61,9 +180,67 @@ class EventLogger:
             }
         }
         
+        # Retention period in days per category, parsed once
+        self.retention_days = {
+            category: self._parse_retention_days(config['retention'])
+            for category, config in self.event_categories.items()
+        }
+        
+        # Flattened lookups for the logging hot path
+        self._events = {
+            event_id: EventMeta(
+                category=category,
+                name=name,
+                severity=config['severity'],
+                retention_days=self.retention_days[category],
+                win_event_type=_WIN_EVENT_TYPE.get(
+                    config['severity'], win32evtlog.EVENTLOG_INFORMATION_TYPE
+                )
+            )
+            for category, config in self.event_categories.items()
+            for event_id, name in config['event_ids'].items()
+        }
+        self._severity_by_category = {
+            category: config['severity']
+            for category, config in self.event_categories.items()
+        }
+        
+        # Half-open event_type ranges matching 'category:*', usable by the index
+        self._category_prefix_range = {
+            category: self._prefix_range(category) for category in self.event_categories
+        }
+        
         # Setup logging
         self.setup_logging()
+        self._ensure_indexes()
+        atexit.register(self.close)
         
+    def _get_connection(self) -> sqlite3.Connection:
+        """Return the shared database connection, opening it on first use"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._conn = conn
+        return self._conn
+        
+    def _ensure_indexes(self):
+        """Create the indexes used by event queries"""
+        try:
+            with self._conn_lock:
+                conn = self._get_connection()
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_event_type_ts
+                    ON event_log(event_type, timestamp DESC)
+                """)
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_ts_type
+                    ON event_log(timestamp, event_type)
+                """)
+        except Exception as e:
+            self.logger.debug(f"Event log index creation failed: {e}")
+            
     def setup_logging(self):
         """Setup comprehensive logging system"""
         log_dir = Path("C:/ProgramData/VoiceGuard/logs")
@@ -107,12 +284,18 @@ class EventLogger:
         security_handler.setLevel(logging.WARNING)
         handlers.append(security_handler)
         
+        # File I/O and rotation happen on the listener thread; callers only enqueue
+        log_queue = queue.Queue(-1)
+        self._log_listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        
         # Configure root logger
         root_logger = logging.getLogger()
         root_logger.setLevel(logging.INFO)
+        root_logger.addHandler(TracebackQueueHandler(log_queue))
         
-        for handler in handlers:
-            root_logger.addHandler(handler)
+        self._log_listener.start()
             
     def log_security_event(self, event_id: int, message: str, context: Dict = None):
         """Log security-related events"""
@@ -127,66 +310,228 @@ class EventLogger:
         self._log_event('performance', event_id, message, context, logging.INFO)
         
     def _log_event(self, category: str, event_id: int, message: str, 
-                   context: Dict = None, level: int = logging.INFO):
+                   context: Dict = None, level: int = logging.INFO, coalesce: bool = True):
         """Internal method to log events"""
+        should_log_python = self.logger.isEnabledFor(level)
+        should_persist_db = level >= self.db_min_level
+        should_report_win = category == 'security' or event_id in _CRITICAL_WIN_IDS
+        
+        # Nothing would record this event; skip building it
+        if not (should_log_python or should_persist_db or should_report_win):
+            return
+            
+        # Bursts of the same event are counted and summarized later
+        if coalesce and self._coalesce_event(category, event_id, message, context, level):
+            return
+            
         try:
             with self.log_lock:
-                # Get event details
-                event_details = self.event_categories.get(category, {})
-                event_name = event_details.get('event_ids', {}).get(event_id, 'Unknown Event')
-                
+                # Get event details; IDs logged under another category stay unknown
+                meta = self._events.get(event_id)
+                if meta is not None and meta.category != category:
+                    meta = None
+                    
                 # Create structured log entry
                 log_entry = {
-                    'timestamp': datetime.now(timezone.utc).isoformat(),
+                    'timestamp': _now_iso(),
                     'category': category,
                     'event_id': event_id,
-                    'event_name': event_name,
+                    'event_name': meta.name if meta else 'Unknown Event',
                     'message': message,
                     'context': context or {},
-                    'severity': event_details.get('severity', 'Unknown')
+                    'severity': meta.severity if meta else self._severity_by_category.get(category, 'Unknown')
                 }
                 
+                if should_log_python or should_persist_db:
+                    # Serialize once and share the payload between sinks
+                    serialized = json.dumps(log_entry, separators=_JSON_SEPARATORS, default=str)
+                    
                 # Log to Python logging system
-                self.logger.log(level, f"[{category.upper()}:{event_id}] {event_name}: {message}", 
-                              extra={'structured_data': log_entry})
-                
+                if should_log_python:
+                    self.logger.log(level, f"[{category.upper()}:{event_id}] {log_entry['event_name']}: {message}", 
+                                  extra={'structured_data': log_entry, 'structured_json': serialized})
+                    
                 # Log to database
-                self._log_to_database(log_entry)
-                
-                # Log to Windows Event Log (for critical events)
-                if category == 'security' or event_id in [2002, 1001, 1002]:
-                    self._log_to_windows_event_log(log_entry)
+                if should_persist_db:
+                    self._log_to_database(log_entry, serialized)
+                    
+                # Log to Windows Event Log (for critical events) from the writer thread
+                if should_report_win:
+                    win_event_type = meta.win_event_type if meta else None
+                    self._enqueue(('winevt', (log_entry, win_event_type)))
                     
         except Exception as e:
             self.logger.error(f"Failed to log event: {e}")
             
-    def _log_to_database(self, log_entry: Dict):
-        """Log event to database"""
+    def _coalesce_event(self, category: str, event_id: int, message: str,
+                        context: Optional[Dict], level: int) -> bool:
+        """Count an event occurrence, returning True if it should be suppressed"""
+        key = (category, event_id, message)
+        now = time.monotonic()
+        expired = []
+        
+        with self._coalesce_lock:
+            entry = self._coalesce.get(key)
+            
+            if entry is not None and now - entry[2] >= _COALESCE_WINDOW:
+                expired.append((key, self._coalesce.pop(key)))
+                entry = None
+                
+            if entry is None:
+                # Bound the table, summarizing whichever window is evicted
+                if len(self._coalesce) >= _COALESCE_MAX_KEYS:
+                    oldest = next(iter(self._coalesce))
+                    expired.append((oldest, self._coalesce.pop(oldest)))
+                self._coalesce[key] = [1, 0, now, level, context]
+                suppress = False
+            else:
+                entry[0] += 1
+                suppress = entry[0] > _COALESCE_THRESHOLD
+                if suppress:
+                    entry[1] += 1
+                    entry[4] = context
+                    
+        self._log_coalesced(expired)
+        return suppress
+        
+    def _log_coalesced(self, entries: List[Tuple[tuple, list]]):
+        """Log one summary event per window that had suppressed repeats"""
+        for (category, event_id, message), (seen, suppressed, _, level, context) in entries:
+            if suppressed:
+                summary_context = dict(context or {})
+                summary_context['coalesced_count'] = suppressed
+                self._log_event(category, event_id, message, summary_context, level,
+                                coalesce=False)
+                
+    def _flush_coalesced(self, force: bool = False):
+        """Summarize and forget coalescing windows that have ended"""
+        now = time.monotonic()
+        with self._coalesce_lock:
+            expired = [
+                (key, entry) for key, entry in self._coalesce.items()
+                if force or now - entry[2] >= _COALESCE_WINDOW
+            ]
+            for key, _ in expired:
+                del self._coalesce[key]
+                
+        self._log_coalesced(expired)
+        
+    def _coalesce_loop(self):
+        """Periodically emit summaries for finished bursts"""
+        while not self._coalesce_stop.wait(_COALESCE_WINDOW):
+            self._flush_coalesced()
+            
+    def _log_to_database(self, log_entry: Dict, serialized: Optional[str] = None):
+        """Queue event for the database writer thread"""
+        # Without a pre-built payload the dict is bound as-is and encoded by the
+        # registered adapter on the writer thread
+        row = (
+            f"{log_entry['category']}:{log_entry['event_id']}",
+            serialized if serialized is not None else log_entry,
+            log_entry['context'].get('confidence', None),
+            log_entry['timestamp']
+        )
+        self._enqueue(('sqlite', row))
+        
+    def _enqueue(self, item: Tuple[str, Any]):
+        """Hand a ('sqlite', row) or ('winevt', (log_entry, event_type)) item to the writer thread"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    INSERT INTO event_log (event_type, event_data, confidence_score, timestamp)
-                    VALUES (?, ?, ?, ?)
-                """, (
-                    f"{log_entry['category']}:{log_entry['event_id']}",
-                    json.dumps(log_entry),
-                    log_entry['context'].get('confidence', None),
-                    log_entry['timestamp']
-                ))
-        except Exception as e:
-            self.logger.error(f"Database logging failed: {e}")
+            self._write_q.put_nowait(item)
+        except queue.Full:
+            # Drop the oldest queued event rather than block the caller
+            try:
+                self._write_q.get_nowait()
+                self._write_q.task_done()
+                self._write_q.put_nowait(item)
+            except (queue.Empty, queue.Full):
+                self.logger.error("Event logging queue full, event dropped")
+                
+    def _writer_loop(self):
+        """Drain queued events and write them to the database in batches"""
+        running = True
+        
+        while running:
+            item = self._write_q.get()
+            if item is _STOP_WRITER:
+                self._write_q.task_done()
+                break
+                
+            batch = [item]
+            deadline = time.monotonic() + _WRITE_BATCH_TIMEOUT
+            
+            while len(batch) < _WRITE_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._write_q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP_WRITER:
+                    self._write_q.task_done()
+                    running = False
+                    break
+                batch.append(item)
+                
+            self._write_batch(batch)
+            
+            for _ in batch:
+                self._write_q.task_done()
+                
+    def _write_batch(self, batch: List[Tuple[str, Any]]):
+        """Write a drained batch: database rows in one transaction, then Windows events"""
+        rows = [payload for kind, payload in batch if kind == 'sqlite']
+        if rows:
+            self._insert_rows(rows)
             
-    def _log_to_windows_event_log(self, log_entry: Dict):
+        for kind, payload in batch:
+            if kind == 'winevt':
+                # Failures are handled per event inside
+                self._log_to_windows_event_log(*payload)
+                
+    def _insert_rows(self, rows: List[tuple]):
+        """Insert event rows in a single transaction"""
+        with self._conn_lock:
+            try:
+                conn = self._get_connection()
+                conn.execute("BEGIN")
+                conn.executemany(_INSERT_EVENT_SQL, rows)
+                conn.execute("COMMIT")
+            except Exception as e:
+                if self._conn is not None and self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                self.logger.error(f"Database logging failed: {e}")
+                
+    def flush(self):
+        """Block until all queued events have been written"""
+        if self._writer_thread.is_alive():
+            self._write_q.join()
+            
+    def close(self):
+        """Flush queued events, stop the writer thread and close the database"""
+        if self._coalesce_thread.is_alive():
+            self._coalesce_stop.set()
+            self._coalesce_thread.join(timeout=5)
+            self._flush_coalesced(force=True)
+            
+        if self._writer_thread.is_alive():
+            self._write_q.put(_STOP_WRITER)
+            self._writer_thread.join(timeout=5)
+            
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
+            
+    def _log_to_windows_event_log(self, log_entry: Dict, event_type: Optional[int] = None):
         """Log critical events to Windows Event Log"""
         try:
-            # Map severity to Windows event type
-            event_type_map = {
-                'High': win32evtlog.EVENTLOG_ERROR_TYPE,
-                'Medium': win32evtlog.EVENTLOG_WARNING_TYPE,
-                'Low': win32evtlog.EVENTLOG_INFORMATION_TYPE
-            }
-            
-            event_type = event_type_map.get(log_entry['severity'], win32evtlog.EVENTLOG_INFORMATION_TYPE)
+            if event_type is None:
+                event_type = _WIN_EVENT_TYPE.get(log_entry['severity'], win32evtlog.EVENTLOG_INFORMATION_TYPE)
             
             # Create event message
             event_message = f"{log_entry['event_name']}: {log_entry['message']}"
@@ -204,53 +549,83 @@ class EventLogger:
         except Exception as e:
             self.logger.debug(f"Windows Event Log failed: {e}")
             
+    def _query_events(self, category: str = None, start_iso: str = None,
+                      end_iso: str = None, limit: int = 100) -> sqlite3.Cursor:
+        """Run an event query with optional category and inclusive timestamp range"""
+        clauses = []
+        params = []
+        
+        if category:
+            # Half-open range on the prefix so the event_type index is used
+            low, high = (self._category_prefix_range.get(category)
+                         or self._prefix_range(category))
+            clauses.append("event_type >= ? AND event_type < ?")
+            params.extend((low, high))
+            
+        if start_iso:
+            clauses.append("timestamp >= ?")
+            params.append(start_iso)
+            
+        if end_iso:
+            clauses.append("timestamp <= ?")
+            params.append(end_iso)
+            
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        
+        with self._conn_lock:
+            return self._get_connection().execute(f"""
+                SELECT event_type, event_data, timestamp
+                FROM event_log
+                {where}
+                ORDER BY timestamp DESC
+                LIMIT ?
+            """, params)
+            
+    def iter_events(self, category: str = None, limit: int = 100,
+                    start_iso: str = None, end_iso: str = None) -> Iterator[Dict]:
+        """Yield recent events from database, newest first"""
+        cursor = self._query_events(category, start_iso, end_iso, limit)
+        
+        while True:
+            # Hold the connection lock per chunk, not while the caller iterates
+            with self._conn_lock:
+                rows = cursor.fetchmany(256)
+            if not rows:
+                break
+                
+            for row in rows:
+                try:
+                    yield json.loads(row[1])
+                except json.JSONDecodeError:
+                    # Fallback for non-JSON data
+                    yield {
+                        'event_type': row[0],
+                        'message': row[1],
+                        'timestamp': row[2]
+                    }
+                    
     def get_recent_events(self, category: str = None, limit: int = 100) -> List[Dict]:
         """Get recent events from database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                if category:
-                    cursor = conn.execute("""
-                        SELECT event_type, event_data, timestamp
-                        FROM event_log
-                        WHERE event_type LIKE ?
-                        ORDER BY timestamp DESC
-                        LIMIT ?
-                    """, (f"{category}:%", limit))
-                else:
-                    cursor = conn.execute("""
-                        SELECT event_type, event_data, timestamp
-                        FROM event_log
-                        ORDER BY timestamp DESC
-                        LIMIT ?
-                    """, (limit,))
-                    
-                events = []
-                for row in cursor.fetchall():
-                    try:
-                        event_data = json.loads(row[1])
-                        events.append(event_data)
-                    except json.JSONDecodeError:
-                        # Fallback for non-JSON data
-                        events.append({
-                            'event_type': row[0],
-                            'message': row[1],
-                            'timestamp': row[2]
-                        })
-                        
-                return events
-                
+            return list(self.iter_events(category, limit))
+            
         except Exception as e:
             self.logger.error(f"Failed to retrieve events: {e}")
             return []
             
     def get_event_statistics(self, days: int = 7) -> Dict:
         """Get event statistics for the last N days"""
+        cached = self._stats_cache.get(days)
+        if cached and cached[0] > time.monotonic():
+            return dict(cached[1])
+            
         try:
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
             
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT event_type, COUNT(*) as count
+            with self._conn_lock:
+                cursor = self._get_connection().execute("""
+                    SELECT event_type, COUNT(*) AS count, SUM(COUNT(*)) OVER () AS total
                     FROM event_log
                     WHERE timestamp > ?
                     GROUP BY event_type
@@ -260,81 +635,117 @@ class EventLogger:
                 stats = {}
                 total_events = 0
                 
-                for row in cursor.fetchall():
-                    event_type = row[0]
-                    count = row[1]
+                for event_type, count, total in cursor.fetchall():
                     stats[event_type] = count
-                    total_events += count
+                    total_events = total
                     
-                return {
-                    'total_events': total_events,
-                    'event_breakdown': stats,
-                    'period_days': days
-                }
-                
+            result = {
+                'total_events': total_events,
+                'event_breakdown': stats,
+                'period_days': days
+            }
+            self._stats_cache[days] = (time.monotonic() + _STATS_CACHE_TTL, result)
+            return dict(result)
+            
         except Exception as e:
             self.logger.error(f"Failed to get event statistics: {e}")
             return {'total_events': 0, 'event_breakdown': {}, 'period_days': days}
             
+    @staticmethod
+    def _prefix_range(category: str) -> Tuple[str, str]:
+        """Bounds of the event_type values belonging to a category"""
+        return f"{category}:", f"{category};"
+        
+    @staticmethod
+    def _parse_retention_days(retention: str) -> int:
+        """Parse a retention period such as '90 days' into days"""
+        if 'year' in retention:
+            return 365
+        elif 'day' in retention:
+            return int(retention.split()[0])
+        else:
+            return 30  # Default
+            
     def cleanup_old_events(self):
         """Cleanup old events based on retention policies"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                for category, config in self.event_categories.items():
-                    retention = config['retention']
-                    
-                    # Parse retention period
-                    if 'year' in retention:
-                        days = 365
-                    elif 'day' in retention:
-                        days = int(retention.split()[0])
-                    else:
-                        days = 30  # Default
+            for category, days in self.retention_days.items():
+                cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+                low, high = self._category_prefix_range[category]
+                deleted_count = 0
+                
+                # Delete in bounded chunks so the writer lock is released between them
+                while True:
+                    with self._conn_lock:
+                        cursor = self._get_connection().execute("""
+                            DELETE FROM event_log
+                            WHERE rowid IN (
+                                SELECT rowid FROM event_log
+                                WHERE event_type >= ? AND event_type < ? AND timestamp < ?
+                                LIMIT ?
+                            )
+                        """, (low, high, cutoff_date.isoformat(),
+                              _CLEANUP_CHUNK_SIZE))
                         
-                    cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-                    
-                    # Delete old events
-                    cursor = conn.execute("""
-                        DELETE FROM event_log
-                        WHERE event_type LIKE ? AND timestamp < ?
-                    """, (f"{category}:%", cutoff_date.isoformat()))
-                    
-                    deleted_count = cursor.rowcount
-                    if deleted_count > 0:
-                        self.logger.info(f"Cleaned up {deleted_count} old {category} events")
+                    deleted_count += cursor.rowcount
+                    if cursor.rowcount < _CLEANUP_CHUNK_SIZE:
+                        break
                         
+                if deleted_count > 0:
+                    self.logger.info(f"Cleaned up {deleted_count} old {category} events")
+                    
         except Exception as e:
             self.logger.error(f"Event cleanup failed: {e}")
             
     def export_events(self, output_file: Path, category: str = None, 
                      start_date: datetime = None, end_date: datetime = None):
         """Export events to file"""
+        output_file = Path(output_file)
+        tmp_file = output_file.with_suffix('.tmp')
         try:
-            events = self.get_recent_events(category, limit=10000)
+            # Filter by date range in SQL; stored timestamps are UTC ISO strings
+            start_iso = (start_date.astimezone(timezone.utc).isoformat(timespec='milliseconds')
+                         if start_date else None)
+            end_iso = (end_date.astimezone(timezone.utc).isoformat(timespec='milliseconds')
+                       if end_date else None)
             
-            # Filter by date range if specified
-            if start_date or end_date:
-                filtered_events = []
-                for event in events:
-                    event_time = datetime.fromisoformat(event['timestamp'])
-                    
-                    if start_date and event_time < start_date:
-                        continue
-                    if end_date and event_time > end_date:
-                        continue
-                        
-                    filtered_events.append(event)
-                    
-                events = filtered_events
-                
-            # Export to JSON
-            with open(output_file, 'w') as f:
-                json.dump(events, f, indent=2, default=str)
+            # Stream a JSON array so the export is never held in memory; write
+            # to a temporary file so a failed export leaves no partial output
+            count = 0
+            with open(tmp_file, 'w') as f:
+                f.write('[')
+                for event in self.iter_events(category, 10000, start_iso, end_iso):
+                    f.write(',\n  ' if count else '\n  ')
+                    f.write(json.dumps(event, default=str))
+                    count += 1
+                f.write('\n]\n' if count else ']\n')
+            os.replace(tmp_file, output_file)
                 
-            self.logger.info(f"Exported {len(events)} events to {output_file}")
+            self.logger.info(f"Exported {count} events to {output_file}")
             
         except Exception as e:
             self.logger.error(f"Event export failed: {e}")
+            try:
+                tmp_file.unlink()
+            except OSError:
+                pass
+
+
+class TracebackQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that keeps the traceback out of the queued message"""
+    
+    def prepare(self, record):
+        # The stock prepare() folds the traceback into msg and drops it; carry
+        # it in exc_text instead so formatters can still place it themselves
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
 
 
 class JsonFormatter(logging.Formatter):
@@ -342,7 +753,7 @@ class JsonFormatter(logging.Formatter):
     
     def format(self, record):
         log_entry = {
-            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'timestamp': _iso_timestamp(record.created),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -351,12 +762,22 @@ class JsonFormatter(logging.Formatter):
             'line': record.lineno
         }
         
+        # Add exception info if present; queued records carry only exc_text
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log_entry['exception'] = record.exc_text
+            
+        # Splice in pre-serialized structured data instead of re-encoding it;
+        # structured keys win, matching the dict.update() below
+        prebuilt = getattr(record, 'structured_json', None)
+        if prebuilt and len(prebuilt) > 2 and hasattr(record, 'structured_data'):
+            for key in record.structured_data:
+                log_entry.pop(key, None)
+            return json.dumps(log_entry, separators=_JSON_SEPARATORS)[:-1] + ',' + prebuilt[1:]
+            
         # Add structured data if available
         if hasattr(record, 'structured_data'):
             log_entry.update(record.structured_data)
             
-        # Add exception info if present
-        if record.exc_info:
-            log_entry['exception'] = self.formatException(record.exc_info)
-            
-        return json.dumps(log_entry)
+        return json.dumps(log_entry, separators=_JSON_SEPARATORS)
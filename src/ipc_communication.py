@@ -5,59 +5,255 @@ Named Pipes IPC implementation for service-to-helper communication
 """
 
 import asyncio
+import os
 import json
-import uuid
+import itertools
 import win32pipe
 import win32file
+import win32event
 import win32security
 import ntsecuritycon
+import pywintypes
+import winerror
 import threading
-import queue
+import time
 import logging
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
 import struct
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+if ORJSON_AVAILABLE:
+    def _dumps(data: Any) -> bytes:
+        """Serialize to UTF-8 JSON bytes"""
+        # orjson writes datetimes as ISO 8601 natively
+        return orjson.dumps(data)
+        
+    _loads = orjson.loads
+else:
+    def _encode_default(value: Any) -> Any:
+        """Encode values the json module cannot serialize"""
+        if isinstance(value, datetime):
+            return value.isoformat()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+        
+    def _dumps(data: Any) -> bytes:
+        """Serialize to UTF-8 JSON bytes"""
+        return json.dumps(data, default=_encode_default).encode('utf-8')
+        
+    def _loads(data) -> Any:
+        """Deserialize UTF-8 JSON from any bytes-like object"""
+        # json.loads accepts bytes and bytearray but not memoryview
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+
+# ACKs only carry the acknowledged message_id; everything else is constant
+_ACK_PREFIX = b'{"type":"ACK","payload":{"message_id":'
+_ACK_SUFFIX = b'}}'
+
+
+def build_ack(message_id: str) -> bytes:
+    """Build a framed ACK without constructing an IPCMessage"""
+    body = _ACK_PREFIX + _dumps(message_id) + _ACK_SUFFIX
+    return struct.pack('<I', len(body)) + body
+
+
+# Pipe buffer size; one ReadFile of this size returns a whole typical message
+_PIPE_BUFFER_SIZE = 65536
+
+
+def read_message(pipe_handle) -> Optional[memoryview]:
+    """Read one length-prefixed message body, or None if the pipe closed"""
+    data = win32file.ReadFile(pipe_handle, _PIPE_BUFFER_SIZE)[1]
+    if len(data) < 4:
+        return None
+        
+    message_length = struct.unpack_from('<I', data, 0)[0]
+    end = 4 + message_length
+    
+    # Messages larger than the buffer arrive over further reads
+    while len(data) < end:
+        chunk = win32file.ReadFile(pipe_handle, end - len(data))[1]
+        if not chunk:
+            return None
+        data += chunk
+        
+    # Slice the body without copying it
+    return memoryview(data)[4:end]
+
+
+# IOCP completion keys; pipe I/O completions use key 0
+_LISTEN_KEY = 1
+_STOP_KEY = 2
+
+# Worker threads servicing the completion port
+_IOCP_WORKERS = 2
+
+# Disconnected pipe instances kept for reuse by later connections
+_IDLE_PIPE_LIMIT = 8
+
+
+# Local server name the system tray listens on (\\.\pipe\VoiceGuardTray)
+TRAY_PIPE_NAME = "VoiceGuardTray"
+
+
+def push_tray_status(status: Dict[str, Any]) -> bool:
+    """Send one newline-delimited JSON status packet to the system tray"""
+    try:
+        with open(rf'\\.\pipe\{TRAY_PIPE_NAME}', 'wb') as pipe:
+            pipe.write(_dumps(status) + b'\n')
+        return True
+    except OSError:
+        # No tray is listening
+        return False
+
+
+class MessageRing:
+    """Bounded ring buffer handing messages from pipe workers to the consumer"""
+    
+    def __init__(self, capacity: int = 1024):
+        # Round up to a power of two so slots are found with a mask
+        size = 1
+        while size < capacity:
+            size <<= 1
+            
+        self._slots = [None] * size
+        self._mask = size - 1
+        self._head = 0  # next slot to pop; only the consumer advances it
+        self._tail = 0  # next slot to fill; only producers advance it
+        
+        # The IOCP workers are the producers, so pushes are serialized; pops are not
+        self._push_lock = threading.Lock()
+        
+    def try_push(self, item) -> bool:
+        """Append an item, returning False if the ring is full"""
+        with self._push_lock:
+            tail = self._tail
+            if tail - self._head > self._mask:
+                return False
+            self._slots[tail & self._mask] = item
+            self._tail = tail + 1
+        return True
+        
+    def try_pop(self):
+        """Remove and return the oldest item, or None if the ring is empty"""
+        head = self._head
+        if head == self._tail:
+            return None
+            
+        slot = head & self._mask
+        item = self._slots[slot]
+        self._slots[slot] = None
+        self._head = head + 1
+        return item
+        
+    def drain_into(self, out: List) -> int:
+        """Move every readable item into out, returning how many were moved"""
+        # One snapshot of the tail and one head update for the whole batch
+        head = self._head
+        tail = self._tail
+        slots = self._slots
+        mask = self._mask
+        for position in range(head, tail):
+            slot = position & mask
+            out.append(slots[slot])
+            slots[slot] = None
+        self._head = tail
+        return tail - head
+        
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+
+class _PipeClient:
+    """Per-instance state for an overlapped server pipe"""
+    
+    def __init__(self, handle):
+        self.handle = handle
+        self.read_ov = pywintypes.OVERLAPPED()
+        self.write_ov = pywintypes.OVERLAPPED()
+        self.buffer = win32file.AllocateReadBuffer(_PIPE_BUFFER_SIZE)
+        self.view = memoryview(self.buffer)
+        self.pending = bytearray()
+        self.closed = False
+
+
+# Message IDs only need to be unique between the service and its helpers, so a
+# per-process counter behind a PID prefix replaces random UUIDs
+_id_prefix = f'{os.getpid():x}-'
+_next_id = itertools.count().__next__
+
+
+def _new_id() -> str:
+    """Return a process-unique message ID"""
+    return f'{_id_prefix}{_next_id():x}'
+
 
 class IPCMessage:
     """IPC message structure"""
     
+    __slots__ = ('type', 'payload', '_timestamp', '_timestamp_text', 'correlation_id', 'message_id')
+    
     def __init__(self, msg_type: str, payload: Dict, correlation_id: str = None):
         self.type = msg_type
         self.payload = payload
-        self.timestamp = datetime.now(timezone.utc)
-        self.correlation_id = correlation_id or str(uuid.uuid4())
-        self.message_id = str(uuid.uuid4())
+        self._timestamp = datetime.now(timezone.utc)
+        self._timestamp_text = None
+        self.correlation_id = correlation_id or _new_id()
+        self.message_id = _new_id()
+        
+    @property
+    def timestamp(self) -> datetime:
+        """Creation time; parsed from the wire format on first access"""
+        if self._timestamp is None:
+            self._timestamp = datetime.fromisoformat(self._timestamp_text)
+        return self._timestamp
+        
+    @timestamp.setter
+    def timestamp(self, value: datetime):
+        self._timestamp = value
+        self._timestamp_text = None
         
     def to_bytes(self) -> bytes:
         """Serialize message to bytes"""
         data = {
             'type': self.type,
             'payload': self.payload,
-            'timestamp': self.timestamp.isoformat(),
+            # Received timestamps are passed through unparsed
+            'timestamp': self._timestamp if self._timestamp is not None else self._timestamp_text,
             'correlation_id': self.correlation_id,
             'message_id': self.message_id
         }
-        json_str = json.dumps(data)
-        json_bytes = json_str.encode('utf-8')
+        json_bytes = _dumps(data)
         
         # Prepend length header (4 bytes)
         length = len(json_bytes)
         return struct.pack('<I', length) + json_bytes
         
     @classmethod
-    def from_bytes(cls, data: bytes) -> 'IPCMessage':
-        """Deserialize message from bytes"""
-        json_str = data.decode('utf-8')
-        data_dict = json.loads(json_str)
+    def from_bytes(cls, data) -> 'IPCMessage':
+        """Deserialize message from bytes or any bytes-like object"""
+        data_dict = _loads(data)
         
         msg = cls(
             data_dict['type'],
             data_dict['payload'],
-            data_dict['correlation_id']
+            data_dict.get('correlation_id')
         )
-        msg.timestamp = datetime.fromisoformat(data_dict['timestamp'])
-        msg.message_id = data_dict['message_id']
+        
+        # Prebuilt ACKs omit the timestamp and IDs
+        if 'timestamp' in data_dict:
+            msg._timestamp = None
+            msg._timestamp_text = data_dict['timestamp']
+        msg.message_id = data_dict.get('message_id', msg.message_id)
         
         return msg
 
@@ -69,9 +265,18 @@ class IPCServer:
         self.pipe_name = r'\\.\pipe\VoiceGuardIPC'
         self.is_running = False
         self.clients = []
-        self.message_queue = queue.Queue()
+        self.message_queue = MessageRing()
         self.logger = logging.getLogger("IPCServer")
         
+        # Built on first use; the DACL needs three account lookups
+        self._sa = None
+        self._idle_pipes = []
+        
+        # Set from the pipe workers to wake a consumer awaiting messages;
+        # bound to the consumer's loop on its first get_pending_messages
+        self._loop = None
+        self._message_event = None
+        
     def create_security_descriptor(self):
         """Create security descriptor for named pipe"""
         # Create security descriptor
@@ -121,103 +326,218 @@ class IPCServer:
     def start(self):
         """Start the IPC server"""
         self.is_running = True
-        self.server_thread = threading.Thread(target=self._server_loop, daemon=True)
-        self.server_thread.start()
+        self.clients_lock = threading.Lock()
+        
+        # A few workers service every pipe instance through one completion port
+        self.completion_port = win32file.CreateIoCompletionPort(
+            win32file.INVALID_HANDLE_VALUE, None, 0, _IOCP_WORKERS
+        )
+        self.workers = [
+            threading.Thread(target=self._completion_loop, daemon=True)
+            for _ in range(_IOCP_WORKERS)
+        ]
+        for worker in self.workers:
+            worker.start()
+            
+        win32file.PostQueuedCompletionStatus(self.completion_port, 0, _LISTEN_KEY, None)
         self.logger.info("IPC Server started")
         
     def stop(self):
         """Stop the IPC server"""
         self.is_running = False
-        if hasattr(self, 'server_thread'):
-            self.server_thread.join(timeout=5)
+        
+        if hasattr(self, 'workers'):
+            for _ in self.workers:
+                win32file.PostQueuedCompletionStatus(self.completion_port, 0, _STOP_KEY, None)
+            for worker in self.workers:
+                worker.join(timeout=5)
+                
+            with self.clients_lock:
+                clients = list(self.clients)
+            for client in clients:
+                self._close_client(client)
+                
+            with self.clients_lock:
+                idle_pipes, self._idle_pipes = self._idle_pipes, []
+            for pipe_handle in idle_pipes:
+                try:
+                    win32file.CloseHandle(pipe_handle)
+                except:
+                    pass
+                    
+            win32file.CloseHandle(self.completion_port)
+            
         self.logger.info("IPC Server stopped")
         
-    def _server_loop(self):
-        """Main server loop"""
+    def _listen(self):
+        """Take an idle or new pipe instance and wait asynchronously for the next client"""
         while self.is_running:
             try:
-                # Create security attributes
-                sa = self.create_security_descriptor()
-                
-                # Create named pipe
-                pipe_handle = win32pipe.CreateNamedPipe(
-                    self.pipe_name,
-                    win32pipe.PIPE_ACCESS_DUPLEX,
-                    win32pipe.PIPE_TYPE_MESSAGE | win32pipe.PIPE_READMODE_MESSAGE | win32pipe.PIPE_WAIT,
-                    win32pipe.PIPE_UNLIMITED_INSTANCES,
-                    65536,  # Output buffer size
-                    65536,  # Input buffer size
-                    0,      # Default timeout
-                    sa      # Security attributes
-                )
+                with self.clients_lock:
+                    pipe_handle = self._idle_pipes.pop() if self._idle_pipes else None
+                    
+                if pipe_handle is None:
+                    # Create security attributes once and reuse them
+                    if self._sa is None:
+                        self._sa = self.create_security_descriptor()
+                        
+                    # Create named pipe
+                    pipe_handle = win32pipe.CreateNamedPipe(
+                        self.pipe_name,
+                        win32pipe.PIPE_ACCESS_DUPLEX | win32file.FILE_FLAG_OVERLAPPED,
+                        win32pipe.PIPE_TYPE_MESSAGE | win32pipe.PIPE_READMODE_MESSAGE | win32pipe.PIPE_WAIT,
+                        win32pipe.PIPE_UNLIMITED_INSTANCES,
+                        _PIPE_BUFFER_SIZE,  # Output buffer size
+                        _PIPE_BUFFER_SIZE,  # Input buffer size
+                        0,      # Default timeout
+                        self._sa  # Security attributes
+                    )
+                    win32file.CreateIoCompletionPort(pipe_handle, self.completion_port, 0, 0)
+                    
+                # Fresh per-connection state, so late completions for a previous
+                # connection on a reused handle still see their own closed client
+                client = _PipeClient(pipe_handle)
                 
+                with self.clients_lock:
+                    self.clients.append(client)
+                    
                 self.logger.info("Waiting for client connection...")
                 
-                # Wait for client connection
-                win32pipe.ConnectNamedPipe(pipe_handle, None)
-                self.logger.info("Client connected to IPC pipe")
-                
-                # Handle client in separate thread
-                client_thread = threading.Thread(
-                    target=self._handle_client,
-                    args=(pipe_handle,),
-                    daemon=True
-                )
-                client_thread.start()
+                client.read_ov.object = ('connect', client)
+                rc = win32pipe.ConnectNamedPipe(pipe_handle, client.read_ov)
+                if rc == winerror.ERROR_PIPE_CONNECTED:
+                    # Connected before we waited; no completion packet is queued for it
+                    win32file.PostQueuedCompletionStatus(
+                        self.completion_port, 0, 0, client.read_ov
+                    )
+                return
                 
             except Exception as e:
                 self.logger.error(f"IPC server error: {e}")
-                if self.is_running:
-                    import time
-                    time.sleep(1)
-                    
-    def _handle_client(self, pipe_handle):
-        """Handle individual client connection"""
-        try:
-            while self.is_running:
-                # Read message length
-                try:
-                    length_data = win32file.ReadFile(pipe_handle, 4)[1]
-                    if len(length_data) != 4:
-                        break
+                time.sleep(1)
+                
+    def _completion_loop(self):
+        """Dispatch completed pipe operations"""
+        while True:
+            rc, num_bytes, key, overlapped = win32file.GetQueuedCompletionStatus(
+                self.completion_port, win32event.INFINITE
+            )
+            
+            if key == _STOP_KEY:
+                break
+            if key == _LISTEN_KEY:
+                self._listen()
+                continue
+            if overlapped is None or overlapped.object is None:
+                continue
+                
+            kind, client = overlapped.object[:2]
+            if client.closed:
+                continue
+                
+            try:
+                if kind == 'connect':
+                    self._listen()
+                    if rc != 0:
+                        self._close_client(client)
+                        continue
                         
-                    message_length = struct.unpack('<I', length_data)[0]
-                    
-                    # Read message data
-                    message_data = win32file.ReadFile(pipe_handle, message_length)[1]
+                    self.logger.info("Client connected to IPC pipe")
+                    self._issue_read(client)
                     
-                    # Parse message
-                    message = IPCMessage.from_bytes(message_data)
-                    
-                    # Add to message queue
-                    self.message_queue.put(message)
-                    
-                    # Send acknowledgment
-                    ack = IPCMessage("ACK", {"message_id": message.message_id})
-                    ack_bytes = ack.to_bytes()
-                    win32file.WriteFile(pipe_handle, ack_bytes)
+                elif kind == 'read':
+                    if rc not in (0, winerror.ERROR_MORE_DATA) or num_bytes == 0:
+                        self._close_client(client)
+                        continue
+                        
+                    chunk = client.view[:num_bytes]
                     
-                except Exception as e:
-                    self.logger.error(f"Client communication error: {e}")
-                    break
+                    if rc == 0 and not client.pending:
+                        # Whole message in one read: parse it in place, before
+                        # the next read reuses the buffer
+                        self._handle_frame(client, chunk)
+                    else:
+                        # Message mode: the rest of a large message follows in further reads
+                        client.pending += chunk
+                        if rc == 0:
+                            frame, client.pending = client.pending, bytearray()
+                            self._handle_frame(client, memoryview(frame))
+                            
+                    self._issue_read(client)
                     
-        finally:
+            except Exception as e:
+                self.logger.error(f"Client communication error: {e}")
+                self._close_client(client)
+                
+    def _issue_read(self, client: _PipeClient):
+        """Start an overlapped read on a client pipe"""
+        client.read_ov.object = ('read', client)
+        win32file.ReadFile(client.handle, client.buffer, client.read_ov)
+        
+    def _handle_frame(self, client: _PipeClient, frame: memoryview):
+        """Parse a framed message, queue it and acknowledge it"""
+        message_length = struct.unpack_from('<I', frame, 0)[0]
+        message = IPCMessage.from_bytes(frame[4:4 + message_length])
+        
+        # Add to message queue
+        if not self.message_queue.try_push(message):
+            self.logger.error(f"IPC message queue full, dropped {message.type} message")
+                
+        # Wake a waiting consumer
+        loop = self._loop
+        if loop is not None:
             try:
-                win32file.CloseHandle(pipe_handle)
-            except:
+                loop.call_soon_threadsafe(self._message_event.set)
+            except RuntimeError:
+                # Consumer loop already closed
                 pass
-            self.logger.info("Client disconnected from IPC pipe")
+        
+        # Send acknowledgment; the bytes live on the OVERLAPPED until it completes
+        ack_bytes = build_ack(message.message_id)
+        client.write_ov.object = ('write', client, ack_bytes)
+        win32file.WriteFile(client.handle, ack_bytes, client.write_ov)
+        
+    def _close_client(self, client: _PipeClient):
+        """Close a client pipe instance"""
+        with self.clients_lock:
+            if client.closed:
+                return
+            client.closed = True
+            if client in self.clients:
+                self.clients.remove(client)
+                
+        # Disconnected instances go back to the idle pool while there is room,
+        # skipping the CreateNamedPipe/CloseHandle cycle for the next client
+        if self.is_running:
+            try:
+                win32pipe.DisconnectNamedPipe(client.handle)
+                with self.clients_lock:
+                    if len(self._idle_pipes) < _IDLE_PIPE_LIMIT:
+                        self._idle_pipes.append(client.handle)
+                        self.logger.info("Client disconnected from IPC pipe")
+                        return
+            except Exception as e:
+                self.logger.debug(f"Could not recycle pipe instance: {e}")
+                
+        try:
+            win32file.CloseHandle(client.handle)
+        except:
+            pass
+        self.logger.info("Client disconnected from IPC pipe")
+        
+    async def get_pending_messages(self, wait: bool = False) -> List[IPCMessage]:
+        """Get all pending messages from queue, optionally waiting for at least one"""
+        if self._message_event is None:
+            self._message_event = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
             
-    async def get_pending_messages(self) -> List[IPCMessage]:
-        """Get all pending messages from queue"""
         messages = []
-        while not self.message_queue.empty():
-            try:
-                message = self.message_queue.get_nowait()
-                messages.append(message)
-            except queue.Empty:
-                break
-        return messages
+        while True:
+            # Clear before draining so a push after the drain still wakes us
+            self._message_event.clear()
+            if self.message_queue.drain_into(messages) or not wait:
+                return messages
+            await self._message_event.wait()
         
     async def send_message(self, message: IPCMessage):
         """Send message to connected clients (placeholder)"""
@@ -282,10 +602,10 @@ class IPCClient:
             win32file.WriteFile(self.pipe_handle, message_bytes)
             
             # Wait for acknowledgment
-            length_data = win32file.ReadFile(self.pipe_handle, 4)[1]
-            message_length = struct.unpack('<I', length_data)[0]
-            ack_data = win32file.ReadFile(self.pipe_handle, message_length)[1]
-            
+            ack_data = read_message(self.pipe_handle)
+            if ack_data is None:
+                raise ConnectionError("Pipe closed before acknowledgment")
+                
             ack_message = IPCMessage.from_bytes(ack_data)
             
             if ack_message.type == "ACK":
@@ -5,11 +5,125 @@ Fast keyword matching for emergency fallback recognition
 """
 
 import re
+import sys
+import bisect
+import asyncio
 import difflib
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 import logging
+from collections import namedtuple
 import numpy as np
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _similarity(a: str, b: str) -> float:
+    """Normalized similarity of two strings in [0, 1]"""
+    if RAPIDFUZZ_AVAILABLE:
+        return fuzz.ratio(a, b) / 100.0
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def _best_similarity(text: str, choices, cutoff: float) -> Tuple[Optional[int], float]:
+    """Index and score of the first best-scoring choice at or above cutoff"""
+    if RAPIDFUZZ_AVAILABLE:
+        result = process.extractOne(text, choices, scorer=fuzz.ratio, score_cutoff=cutoff * 100)
+        if result is None:
+            return None, 0.0
+        return result[2], result[1] / 100.0
+        
+    best_index = None
+    best_ratio = 0.0
+    for index, choice in enumerate(choices):
+        matcher = difflib.SequenceMatcher(None, text, choice)
+        # Skip choices whose upper bound cannot beat the current best
+        bound = max(cutoff, best_ratio)
+        if matcher.real_quick_ratio() < bound or matcher.quick_ratio() < bound:
+            continue
+        ratio = matcher.ratio()
+        if ratio >= cutoff and ratio > best_ratio:
+            best_index = index
+            best_ratio = ratio
+    return best_index, best_ratio
+
+
+def _best_jaccard(text_ids: np.ndarray, text_count: int, offsets: np.ndarray,
+                  ids: np.ndarray, threshold: float) -> Tuple[int, float]:
+    """Index and ratio of the first command whose word Jaccard exceeds threshold"""
+    best_index = -1
+    best_ratio = threshold
+    for index in range(offsets.shape[0] - 1):
+        start = offsets[index]
+        end = offsets[index + 1]
+        if start == end:
+            continue
+            
+        # Merge-style intersection of two sorted, de-duplicated id runs
+        i = 0
+        j = start
+        common = 0
+        while i < text_ids.shape[0] and j < end:
+            if text_ids[i] == ids[j]:
+                common += 1
+                i += 1
+                j += 1
+            elif text_ids[i] < ids[j]:
+                i += 1
+            else:
+                j += 1
+                
+        if common:
+            ratio = common / (text_count + (end - start) - common)
+            if ratio > best_ratio:
+                best_ratio = ratio
+                best_index = index
+    return best_index, best_ratio
+
+
+if NUMBA_AVAILABLE:
+    _best_jaccard = njit(cache=True)(_best_jaccard)
+
+
+# Lightweight match record; converted to a dict at the public API boundary
+MatchResult = namedtuple('MatchResult', 'text matched_command confidence source method')
+
+
+# Simple phonetic replacements for common speech recognition errors
+_PHONETIC_REPLACEMENTS = {
+    'emergency': ['emerjency', 'emergancy', 'emargency'],
+    'shutdown': ['shutdoun', 'shut down', 'shotdown'],
+    'kill': ['kil', 'kell'],
+    'switch': ['swich', 'swithc'],
+    'force': ['forse', 'fource'],
+    'stop': ['stap', 'stup']
+}
+
+
+def _unique_patterns(patterns: List[str]) -> List[str]:
+    """Interned patterns with duplicates removed, keeping first-seen order"""
+    return [sys.intern(pattern) for pattern in dict.fromkeys(patterns)]
+
+
+# Joins commands into a single searchable string; cannot occur in spoken text
+_COMMAND_SEPARATOR = '\0'
+
 
 class KeywordMatcher:
     """Fast keyword matching for emergency fallback"""
@@ -19,6 +133,33 @@ class KeywordMatcher:
         self.commands = []
         self.phonetic_patterns = {}
         
+        # Single worker keeps matching off the event loop and the lookups warm
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='kwmatch')
+        
+        # Exact/substring lookup structures, rebuilt whenever patterns change
+        self._command_set = frozenset()
+        self._command_index = {}
+        self._command_blob = ''
+        self._command_starts = []
+        self._variant_command = {}
+        self._automaton = None
+        
+        # Commands and flattened variants as parallel arrays (text, length, owner)
+        self._cmd_array = np.empty(0, dtype=object)
+        self._cmd_lens = np.zeros(0, dtype=np.int64)
+        self._flat_variants = np.empty(0, dtype=object)
+        self._variant_lens = np.zeros(0, dtype=np.int64)
+        self._variant_owner = np.zeros(0, dtype=np.int32)
+        
+        # Last (raw text, normalized text, contained commands, text words) query
+        self._last_query = None
+        
+        # Command words as sorted int ids in one flat array, sliced by offsets
+        self._vocab = {}
+        self._cmd_word_sets = []
+        self._cmd_offsets = np.zeros(1, dtype=np.int64)
+        self._cmd_ids = np.zeros(0, dtype=np.int32)
+        
     def set_commands(self, commands: List[str]):
         """Set the list of commands to match against"""
         self.commands = [cmd.lower().strip() for cmd in commands]
@@ -26,139 +167,263 @@ class KeywordMatcher:
         
     def _build_phonetic_patterns(self):
         """Build phonetic patterns for better matching"""
-        # Simple phonetic replacements for common speech recognition errors
-        phonetic_replacements = {
-            'emergency': ['emerjency', 'emergancy', 'emargency'],
-            'shutdown': ['shutdoun', 'shut down', 'shotdown'],
-            'kill': ['kil', 'kell'],
-            'switch': ['swich', 'swithc'],
-            'force': ['forse', 'fource'],
-            'stop': ['stap', 'stup']
-        }
-        
         for command in self.commands:
             patterns = [command]
             
             # Add phonetic variations
-            for word, variations in phonetic_replacements.items():
+            for word, variations in _PHONETIC_REPLACEMENTS.items():
                 if word in command:
                     for variation in variations:
                         patterns.append(command.replace(word, variation))
                         
-            self.phonetic_patterns[command] = patterns
+            self.phonetic_patterns[command] = _unique_patterns(patterns)
+            
+        self._build_lookups()
+        
+    def _build_lookups(self):
+        """Index commands and phonetic variants for exact, substring and fuzzy lookup"""
+        self._command_set = frozenset(self.commands)
+        self._command_index = {}
+        for index, command in enumerate(self.commands):
+            self._command_index.setdefault(command, index)
+            
+        # All commands in one contiguous string, with the start offset of each
+        self._command_blob = _COMMAND_SEPARATOR.join(self.commands)
+        self._command_starts = []
+        position = 0
+        for command in self.commands:
+            self._command_starts.append(position)
+            position += len(command) + 1
+            
+        # Variations added for commands that are not configured are not indexed
+        self._variant_command = {}
+        for command in self.commands:
+            for pattern in self.phonetic_patterns.get(command, ()):
+                self._variant_command.setdefault(pattern, command)
+                
+        # Flattened variants in command order, with the owning command index
+        variants = []
+        owners = []
+        for index, command in enumerate(self.commands):
+            for pattern in self.phonetic_patterns.get(command, ()):
+                variants.append(pattern)
+                owners.append(index)
+                
+        self._cmd_array = np.empty(len(self.commands), dtype=object)
+        self._cmd_array[:] = self.commands
+        self._cmd_lens = np.fromiter(map(len, self.commands), dtype=np.int64, count=len(self.commands))
+        self._flat_variants = np.empty(len(variants), dtype=object)
+        self._flat_variants[:] = variants
+        self._variant_lens = np.fromiter(map(len, variants), dtype=np.int64, count=len(variants))
+        self._variant_owner = np.array(owners, dtype=np.int32)
+        self._last_query = None
+        
+        self._vocab = {}
+        self._cmd_word_sets = [frozenset(command.split()) for command in self.commands]
+        offsets = [0]
+        ids = []
+        for words in self._cmd_word_sets:
+            ids.extend(sorted(self._vocab.setdefault(word, len(self._vocab)) for word in words))
+            offsets.append(len(ids))
+        self._cmd_offsets = np.array(offsets, dtype=np.int64)
+        self._cmd_ids = np.array(ids, dtype=np.int32)
+        
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE and self.commands:
+            automaton = ahocorasick.Automaton()
+            for command in self.commands:
+                automaton.add_word(command, command)
+            automaton.make_automaton()
+            self._automaton = automaton
+            
+    def _exact_match(self, text: str) -> Optional[MatchResult]:
+        """Exact command or exact phonetic variant match, if any"""
+        if text in self._command_set:
+            return MatchResult(text, text, 1.0, 'keyword_exact', 'exact_match')
+            
+        command = self._variant_command.get(text)
+        if command is not None:
+            return MatchResult(text, command, 1.0, 'keyword_fuzzy', 'phonetic_match')
+        return None
+        
+    def _prepare_text(self, raw_text: str) -> Tuple[str, set, set]:
+        """Normalize text and collect its contained commands and words, memoizing the last call"""
+        last = self._last_query
+        if last is not None and last[0] == raw_text:
+            return last[1:]
+            
+        text = raw_text.lower().strip()
+        query = (raw_text, text, self._contained_commands(text), set(text.split()))
+        self._last_query = query
+        return query[1:]
+        
+    def _best_fuzzy(self, text: str, choices: np.ndarray, lengths: np.ndarray,
+                    cutoff: float) -> Tuple[Optional[int], float]:
+        """Best similarity among choices whose length allows reaching cutoff"""
+        # ratio >= cutoff requires |la - lb| <= (1 - cutoff) * (la + lb)
+        text_len = len(text)
+        survivors = np.flatnonzero(
+            np.abs(lengths - text_len) <= (1 - cutoff) * (lengths + text_len)
+        )
+        if survivors.size == 0:
+            return None, 0.0
+        if survivors.size == len(choices):
+            return _best_similarity(text, choices, cutoff)
             
-    async def match_keywords(self, audio_data: np.ndarray, sample_rate: int) -> Optional[Dict]:
+        # Gather the surviving strings in one indexing operation
+        index, ratio = _best_similarity(text, choices[survivors], cutoff)
+        return (int(survivors[index]), ratio) if index is not None else (None, 0.0)
+        
+    def _first_substring_command(self, text: str, contained: set) -> Optional[int]:
+        """Index of the first command contained in text or containing it"""
+        first = min((self._command_index[command] for command in contained), default=None)
+        
+        if _COMMAND_SEPARATOR in text:
+            for index, command in enumerate(self.commands):
+                if text in command:
+                    first = index if first is None else min(first, index)
+                    break
+            return first
+            
+        # The lowest hit in the blob belongs to the first command containing text
+        position = self._command_blob.find(text)
+        if position >= 0:
+            index = bisect.bisect_right(self._command_starts, position) - 1
+            first = index if first is None else min(first, index)
+        return first
+        
+    def _contained_commands(self, text: str) -> set:
+        """Commands occurring inside text, found in a single automaton pass"""
+        if self._automaton is not None:
+            return {command for _, command in self._automaton.iter(text)}
+        return {command for command in self.commands if command in text}
+        
+    async def match_keywords(self, audio_data: np.ndarray, sample_rate: int,
+                             text: Optional[str] = None) -> Optional[Dict]:
         """Simple keyword matching (placeholder for actual implementation)"""
         # This is a simplified implementation
         # In a real system, you might use phonetic matching or other techniques
         
-        # For now, we'll return None since we don't have actual audio-to-text
-        # conversion in this fallback method
-        return None
+        # Without a transcript there is nothing to match, since this fallback
+        # method has no audio-to-text conversion of its own
+        if text is None:
+            return None
+            
+        return await self.match_text_async(text)
+        
+    async def match_text_async(self, text: str) -> Optional[Dict]:
+        """Match text on the matcher's worker thread without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self.match_text, text)
         
     def match_text(self, text: str) -> Optional[Dict]:
         """Match text against configured commands"""
+        result = self._match_text(text)
+        return result._asdict() if result is not None else None
+        
+    def _match_text(self, text: str) -> Optional[MatchResult]:
+        """Best match for text as a MatchResult; None allocates nothing"""
         if not text or not self.commands:
             return None
             
-        text = text.lower().strip()
-        best_match = None
-        best_ratio = 0
-        match_type = None
+        text, contained, text_words = self._prepare_text(text)
         
-        for command in self.commands:
-            # Exact match
-            if text == command:
-                return {
-                    'text': text,
-                    'matched_command': command,
-                    'confidence': 1.0,
-                    'source': 'keyword_exact',
-                    'method': 'exact_match'
-                }
-                
-            # Substring match
-            if command in text or text in command:
-                ratio = 0.9
-                if ratio > best_ratio:
-                    best_ratio = ratio
-                    best_match = command
-                    match_type = 'substring_match'
-                    
-            # Fuzzy match using difflib
-            ratio = difflib.SequenceMatcher(None, text, command).ratio()
-            if ratio > best_ratio and ratio > 0.7:
-                best_ratio = ratio
-                best_match = command
-                match_type = 'fuzzy_match'
-                
-            # Phonetic pattern matching
-            if command in self.phonetic_patterns:
-                for pattern in self.phonetic_patterns[command]:
-                    ratio = difflib.SequenceMatcher(None, text, pattern).ratio()
-                    if ratio > best_ratio and ratio > 0.8:
-                        best_ratio = ratio
-                        best_match = command
-                        match_type = 'phonetic_match'
-                        
-            # Word-based matching
-            text_words = set(text.split())
-            command_words = set(command.split())
+        # Exact hits need no fuzzy scoring
+        exact = self._exact_match(text)
+        if exact is not None:
+            return exact
             
-            if text_words and command_words:
-                intersection = text_words.intersection(command_words)
-                union = text_words.union(command_words)
-                
-                if intersection:
-                    word_ratio = len(intersection) / len(union)
-                    if word_ratio > best_ratio and word_ratio > 0.6:
-                        best_ratio = word_ratio
-                        best_match = command
-                        match_type = 'word_match'
-                        
-        if best_match and best_ratio > 0.6:
-            return {
-                'text': text,
-                'matched_command': best_match,
-                'confidence': best_ratio,
-                'source': 'keyword_fuzzy',
-                'method': match_type
-            }
+        # Best candidate per method as (confidence, command index, method rank, method);
+        # ties go to the earlier command, then to the earlier method
+        candidates = []
+        
+        # Substring match
+        index = self._first_substring_command(text, contained)
+        if index is not None:
+            candidates.append((0.9, index, 0, 'substring_match'))
+            
+        # Fuzzy match against commands
+        index, ratio = self._best_fuzzy(text, self._cmd_array, self._cmd_lens, 0.7)
+        if index is not None and ratio > 0.7:
+            candidates.append((ratio, index, 1, 'fuzzy_match'))
+            
+        # Phonetic pattern matching against all variants at once
+        index, ratio = self._best_fuzzy(text, self._flat_variants, self._variant_lens, 0.8)
+        if index is not None and ratio > 0.8:
+            candidates.append((ratio, int(self._variant_owner[index]), 2, 'phonetic_match'))
+            
+        # Word-based matching
+        best_word_index, best_word_ratio = self._best_word_match(text_words)
+        if best_word_index is not None:
+            candidates.append((best_word_ratio, best_word_index, 3, 'word_match'))
+            
+        if candidates:
+            best_ratio, best_index, _, match_type = min(
+                candidates, key=lambda c: (-c[0], c[1], c[2])
+            )
+            return MatchResult(text, self.commands[best_index], best_ratio,
+                               'keyword_fuzzy', match_type)
             
         return None
         
+    def _best_word_match(self, text_words: set) -> Tuple[Optional[int], float]:
+        """First command with the highest word Jaccard ratio above 0.6"""
+        if not text_words:
+            return None, 0.0
+            
+        if NUMBA_AVAILABLE:
+            # Unknown words cannot intersect but still count towards the union
+            text_ids = np.array(
+                sorted(self._vocab[word] for word in text_words if word in self._vocab),
+                dtype=np.int32
+            )
+            index, ratio = _best_jaccard(text_ids, len(text_words), self._cmd_offsets,
+                                         self._cmd_ids, 0.6)
+            return (int(index), float(ratio)) if index >= 0 else (None, 0.0)
+            
+        best_index = None
+        best_ratio = 0.6
+        for index, command_words in enumerate(self._cmd_word_sets):
+            common = len(text_words & command_words)
+            if common:
+                ratio = common / (len(text_words) + len(command_words) - common)
+                if ratio > best_ratio:
+                    best_ratio = ratio
+                    best_index = index
+        return best_index, best_ratio
+        
     def match_partial(self, text: str, min_confidence: float = 0.5) -> List[Dict]:
         """Match text against commands and return all matches above threshold"""
         if not text or not self.commands:
             return []
             
-        text = text.lower().strip()
-        matches = []
+        text, contained, _ = self._prepare_text(text)
+        text_len = len(text)
+        matches = [None] * len(self.commands)
         
-        for command in self.commands:
+        for slot, command in enumerate(self.commands):
             best_ratio = 0
             match_type = None
             
             # Exact match
             if text == command:
-                matches.append({
-                    'text': text,
-                    'matched_command': command,
-                    'confidence': 1.0,
-                    'source': 'keyword_exact',
-                    'method': 'exact_match'
-                })
+                matches[slot] = MatchResult(text, command, 1.0, 'keyword_exact', 'exact_match')
                 continue
                 
             # Substring match
-            if command in text or text in command:
+            if command in contained or text in command:
                 ratio = 0.9
                 if ratio > best_ratio:
                     best_ratio = ratio
                     match_type = 'substring_match'
                     
-            # Fuzzy match
-            ratio = difflib.SequenceMatcher(None, text, command).ratio()
+            # Fuzzy match; scores are bounded by 2 * min(len) / (sum of lens), so
+            # candidates whose lengths cannot reach min_confidence are skipped
+            command_len = len(command)
+            if 2 * min(text_len, command_len) >= min_confidence * (text_len + command_len):
+                ratio = _similarity(text, command)
+            else:
+                ratio = 0
             if ratio > best_ratio:
                 best_ratio = ratio
                 match_type = 'fuzzy_match'
@@ -166,30 +431,31 @@ class KeywordMatcher:
             # Phonetic matching
             if command in self.phonetic_patterns:
                 for pattern in self.phonetic_patterns[command]:
-                    ratio = difflib.SequenceMatcher(None, text, pattern).ratio()
+                    pattern_len = len(pattern)
+                    if 2 * min(text_len, pattern_len) < min_confidence * (text_len + pattern_len):
+                        continue
+                    ratio = _similarity(text, pattern)
                     if ratio > best_ratio:
                         best_ratio = ratio
                         match_type = 'phonetic_match'
                         
             if best_ratio >= min_confidence:
-                matches.append({
-                    'text': text,
-                    'matched_command': command,
-                    'confidence': best_ratio,
-                    'source': 'keyword_fuzzy',
-                    'method': match_type
-                })
+                matches[slot] = MatchResult(text, command, best_ratio, 'keyword_fuzzy', match_type)
                 
         # Sort by confidence
-        matches.sort(key=lambda x: x['confidence'], reverse=True)
-        return matches
+        found = [match for match in matches if match is not None]
+        found.sort(key=lambda x: x.confidence, reverse=True)
+        return [match._asdict() for match in found]
         
     def add_command_variations(self, command: str, variations: List[str]):
         """Add custom variations for a command"""
         if command in self.phonetic_patterns:
-            self.phonetic_patterns[command].extend(variations)
+            patterns = self.phonetic_patterns[command] + variations
         else:
-            self.phonetic_patterns[command] = [command] + variations
+            patterns = [command] + variations
+        self.phonetic_patterns[command] = _unique_patterns(patterns)
+            
+        self._build_lookups()
             
     def test_command_matching(self, test_phrases: List[str]) -> Dict:
         """Test command matching with various phrases"""
@@ -224,11 +490,8 @@ class KeywordMatcher:
         
     def optimize_patterns(self):
         """Optimize phonetic patterns for better performance"""
-        # Remove duplicate patterns
-        for command in self.phonetic_patterns:
-            patterns = list(set(self.phonetic_patterns[command]))
-            self.phonetic_patterns[command] = patterns
-            
+        # Patterns are de-duplicated and interned as they are built, so there
+        # is nothing left to do here; kept for API compatibility
         self.logger.info("Phonetic patterns optimized")
         
     def export_patterns(self) -> Dict:
@@ -246,10 +509,16 @@ class KeywordMatcher:
         if 'phonetic_patterns' in patterns_data:
             self.phonetic_patterns = patterns_data['phonetic_patterns']
             
+        self._build_lookups()
         self.logger.info("Phonetic patterns imported")
         
+    def close(self):
+        """Shut down the matching worker thread"""
+        self._pool.shutdown(wait=False)
+        
     def clear_patterns(self):
         """Clear all patterns and commands"""
         self.commands.clear()
         self.phonetic_patterns.clear()
+        self._build_lookups()
         self.logger.info("All patterns cleared")
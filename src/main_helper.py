@@ -8,6 +8,9 @@ import sys
 import os
 import asyncio
 import logging
+import logging.handlers
+import queue
+import atexit
 import signal
 from pathlib import Path
 
@@ -15,34 +18,37 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-# Import VoiceGuard components
-from audio_helper import AudioHelperProcess
-from system_tray import SystemTrayApp
-
-try:
-    from dependency_validator import dependency_validator
-    DEPENDENCY_VALIDATION_AVAILABLE = True
-except ImportError:
-    DEPENDENCY_VALIDATION_AVAILABLE = False
-
 
 def setup_helper_environment():
     """Setup helper process environment"""
     # Ensure data directories exist
     data_dir = Path("C:/ProgramData/VoiceGuard")
     logs_dir = data_dir / "logs"
-    logs_dir.mkdir(parents=True, exist_ok=True)
+    os.makedirs(logs_dir, exist_ok=True)
     
-    # Setup logging
+    # Setup logging; file and console writes happen on a listener thread
+    # so callers only enqueue records
     log_file = logs_dir / "helper.log"
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [
+        logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=10*1024*1024,  # 10MB
+            backupCount=5
+        ),
+        logging.StreamHandler(sys.stdout)
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
     logger = logging.getLogger("VoiceGuardHelper")
     logger.info("VoiceGuard helper process environment initialized")
@@ -54,25 +60,21 @@ def check_audio_prerequisites():
     """Check audio-related prerequisites"""
     logger = logging.getLogger("AudioPrerequisites")
     
-    # Check PyAudio availability
+    # Check PyAudio availability and available input devices; the enumeration
+    # is shared with (and cached by) the dependency validator
     try:
-        import pyaudio
-        audio = pyaudio.PyAudio()
-        
-        # Check for available input devices
-        input_devices = []
-        for i in range(audio.get_device_count()):
-            device_info = audio.get_device_info_by_index(i)
-            if device_info['maxInputChannels'] > 0:
-                input_devices.append(device_info)
-                
-        audio.terminate()
+        from dependency_validator import probe_input_devices
+        input_devices, device_error = probe_input_devices()
         
-        if not input_devices:
+        if device_error:
+            logger.error(f"Audio system check failed: {device_error}")
+            return False
+            
+        if not input_devices.indices:
             logger.warning("No audio input devices found")
             return False
             
-        logger.info(f"Found {len(input_devices)} audio input devices")
+        logger.info(f"Found {len(input_devices.indices)} audio input devices")
         return True
         
     except Exception as e:
@@ -80,16 +82,59 @@ def check_audio_prerequisites():
         return False
 
 
+# (SCM, service) handles kept open between status queries
+_service_handles = None
+
+
+def _close_service_handles():
+    """Close the cached service control manager handles"""
+    global _service_handles
+    if _service_handles is None:
+        return
+        
+    import win32service
+    handles, _service_handles = _service_handles, None
+    for handle in reversed(handles):
+        try:
+            win32service.CloseServiceHandle(handle)
+        except Exception:
+            pass
+
+
+atexit.register(_close_service_handles)
+
+
+def _query_service_state() -> int:
+    """Query the VoiceGuard service state through a cached service handle"""
+    global _service_handles
+    import win32service
+    
+    if _service_handles is None:
+        scm_handle = win32service.OpenSCManager(None, None, win32service.SC_MANAGER_CONNECT)
+        try:
+            service_handle = win32service.OpenService(
+                scm_handle, "VoiceGuardService", win32service.SERVICE_QUERY_STATUS
+            )
+        except Exception:
+            win32service.CloseServiceHandle(scm_handle)
+            raise
+        _service_handles = (scm_handle, service_handle)
+        
+    try:
+        return win32service.QueryServiceStatus(_service_handles[1])[1]
+    except Exception:
+        # Stale handle (e.g. service reinstalled); reopen on the next query
+        _close_service_handles()
+        raise
+
+
 def check_service_connection():
     """Check if VoiceGuard service is running"""
     logger = logging.getLogger("ServiceConnection")
     
     try:
-        import win32serviceutil
-        
         # Check service status
-        status = win32serviceutil.QueryServiceStatus("VoiceGuardService")
-        service_state = status[1]
+        service_state = _query_service_state()
         
         if service_state == 4:  # SERVICE_RUNNING
             logger.info("VoiceGuard service is running")
@@ -108,6 +153,8 @@ async def run_helper_with_tray():
     logger = logging.getLogger("HelperWithTray")
     
     try:
+        from audio_helper import AudioHelperProcess
+        
         # Create helper and tray
         helper = AudioHelperProcess()
         
@@ -118,36 +165,40 @@ async def run_helper_with_tray():
             logger.info("Received shutdown signal")
             shutdown_event.set()
             
-        # Setup signal handlers (Windows doesn't support all POSIX signals)
-        try:
-            import signal
-            signal.signal(signal.SIGINT, lambda s, f: signal_handler())
-            signal.signal(signal.SIGTERM, lambda s, f: signal_handler())
-        except AttributeError:
-            # Some signals not available on Windows
-            pass
+        # Setup signal handlers on the loop itself; the Windows Proactor loop
+        # lacks add_signal_handler, so there the OS handler hands off thread-safely
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, signal_handler)
+            except NotImplementedError:
+                signal.signal(sig, lambda s, f: loop.call_soon_threadsafe(signal_handler))
             
         # Start helper process
         logger.info("Starting audio helper process...")
         helper_task = asyncio.create_task(helper.start())
         
-        # Wait for shutdown signal or helper completion
-        done, pending = await asyncio.wait(
-            [helper_task, asyncio.create_task(shutdown_event.wait())],
-            return_when=asyncio.FIRST_COMPLETED
-        )
-        
+        # Wait for shutdown signal or helper completion, waking every second so
+        # a Ctrl+C is noticed promptly on the Windows Proactor loop; the same
+        # shutdown waiter is reused across wakeups
+        shutdown_task = asyncio.create_task(shutdown_event.wait())
+        waiters = {helper_task, shutdown_task}
+        while not shutdown_event.is_set() and not helper_task.done():
+            await asyncio.wait(waiters, timeout=1.0, return_when=asyncio.FIRST_COMPLETED)
+            
         # Cleanup
         logger.info("Shutting down helper process...")
         helper.is_running = False
         
-        # Cancel pending tasks
-        for task in pending:
-            task.cancel()
+        # Only the shutdown waiter is cancelled; the helper gets to stop gracefully
+        if not shutdown_task.done():
+            shutdown_task.cancel()
             
-        # Wait for helper to finish
+        # Wait for helper to finish; asyncio.timeout arms a timer on this task
+        # instead of wrapping the helper task in another one
         try:
-            await asyncio.wait_for(helper_task, timeout=10.0)
+            async with asyncio.timeout(10.0):
+                await helper_task
         except asyncio.TimeoutError:
             logger.warning("Helper process shutdown timeout")
             
@@ -161,6 +212,8 @@ async def run_helper_headless():
     logger = logging.getLogger("HelperHeadless")
     
     try:
+        from audio_helper import AudioHelperProcess
+        
         # Create helper
         helper = AudioHelperProcess()
         
@@ -180,44 +233,48 @@ def run_audio_test():
     logger = logging.getLogger("AudioTest")
     
     try:
-        import pyaudio
         import numpy as np
-        import time
+        import sounddevice as sd
+        from dependency_validator import probe_input_devices
         
         logger.info("Starting audio test...")
         
-        # Initialize PyAudio
-        audio = pyaudio.PyAudio()
-        
         # List audio devices
         logger.info("Available audio input devices:")
-        for i in range(audio.get_device_count()):
-            device_info = audio.get_device_info_by_index(i)
-            if device_info['maxInputChannels'] > 0:
-                logger.info(f"  {i}: {device_info['name']} ({device_info['maxInputChannels']} channels)")
-                
+        input_devices, device_error = probe_input_devices()
+        if device_error:
+            logger.error(f"Audio device enumeration failed: {device_error}")
+        for i, name, channels in zip(*input_devices):
+            logger.info(f"  {i}: {name} ({channels} channels)")
+            
         # Test default microphone
         try:
-            logger.info("Testing default microphone for 5 seconds...")
-            
-            stream = audio.open(
-                format=pyaudio.paInt16,
-                channels=1,
-                rate=16000,
-                input=True,
-                frames_per_buffer=1024
-            )
+            logger.info("Testing default microphone for up to 5 seconds...")
             
+            # Record into one preallocated buffer, reducing it a batch of blocks
+            # at a time; sounddevice hands back int16 arrays, so there is no
+            # bytes round-trip
+            n_blocks = int(16000 / 1024 * 5)  # 5 seconds
+            batch_blocks = 8  # ~0.5 s between level checks
+            blocks = np.empty((n_blocks, 1024), dtype=np.int16)
+            recorded = 0
             max_level = 0
-            for _ in range(int(16000 / 1024 * 5)):  # 5 seconds
-                data = stream.read(1024)
-                audio_data = np.frombuffer(data, dtype=np.int16)
-                level = np.max(np.abs(audio_data))
-                max_level = max(max_level, level)
-                
-            stream.stop_stream()
-            stream.close()
-            
+            with sd.InputStream(samplerate=16000, channels=1, dtype='int16', blocksize=1024) as stream:
+                while recorded < n_blocks:
+                    batch_end = min(recorded + batch_blocks, n_blocks)
+                    for i in range(recorded, batch_end):
+                        data, _overflowed = stream.read(1024)
+                        blocks[i] = data[:, 0]
+                        
+                    # max|x| without materializing abs(); -(-32768) is clamped to int16 range
+                    batch = blocks[recorded:batch_end]
+                    max_level = max(max_level, int(batch.max()), min(-int(batch.min()), 32767))
+                    recorded = batch_end
+                    
+                    # A clearly live microphone needs no further recording
+                    if max_level > 3000:
+                        break
+
             logger.info(f"Audio test completed. Max level: {max_level} ({max_level/32767*100:.1f}%)")
             
             if max_level > 1000:
@@ -228,8 +285,6 @@ def run_audio_test():
         except Exception as e:
             logger.error(f"Microphone test failed: {e}")
             
-        audio.terminate()
-        
     except Exception as e:
         logger.error(f"Audio test failed: {e}")
 
@@ -277,8 +332,14 @@ async def main_async():
             logger.info("Debug mode enabled")
             command = 'run'  # Continue with normal run
 
+        # Imported only once we know the helper will actually run
+        try:
+            from dependency_validator import dependency_validator
+        except ImportError:
+            dependency_validator = None
+
         # Validate audio dependencies
-        if DEPENDENCY_VALIDATION_AVAILABLE:
+        if dependency_validator is not None:
             logger.info("Validating audio dependencies...")
 
             try:
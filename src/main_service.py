@@ -7,48 +7,64 @@ Main service entry point and Windows Service wrapper
 import sys
 import os
 import logging
+import logging.handlers
+import queue
+import atexit
 import asyncio
 import signal
+import importlib.util
 from pathlib import Path
 
 # Add project root to Python path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-# Import VoiceGuard components
-from voiceguard_service import VoiceGuardService
-from config_manager import ConfigurationManager
-from event_logger import EventLogger
+# VoiceGuard components pull in pywin32, numpy and friends, so they are
+# imported inside the commands that need them; this must match
+# VoiceGuardService._svc_name_
+_SVC_NAME = "VoiceGuardService"
 
-try:
-    from dependency_validator import dependency_validator
-    DEPENDENCY_VALIDATION_AVAILABLE = True
-except ImportError:
-    DEPENDENCY_VALIDATION_AVAILABLE = False
+# Per-command loggers, looked up once
+_PREREQ_LOG = logging.getLogger("Prerequisites")
+_INSTALL_LOG = logging.getLogger("ServiceInstaller")
+_REMOVE_LOG = logging.getLogger("ServiceRemover")
+_START_LOG = logging.getLogger("ServiceStarter")
+_STOP_LOG = logging.getLogger("ServiceStopper")
+_CONSOLE_LOG = logging.getLogger("ConsoleMode")
 
 
 def setup_service_environment():
     """Setup service environment and logging"""
-    # Ensure data directories exist
+    # Ensure data directories exist; creating the leaves creates the shared parent
     data_dir = Path("C:/ProgramData/VoiceGuard")
-    data_dir.mkdir(parents=True, exist_ok=True)
-    
     logs_dir = data_dir / "logs"
-    logs_dir.mkdir(exist_ok=True)
-    
     config_dir = data_dir / "config"
-    config_dir.mkdir(exist_ok=True)
+    os.makedirs(logs_dir, exist_ok=True)
+    os.makedirs(config_dir, exist_ok=True)
     
-    # Setup logging
+    # Setup logging; file and console writes happen on a listener thread
+    # so callers only enqueue records
     log_file = logs_dir / "service.log"
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [
+        logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=10*1024*1024,  # 10MB
+            backupCount=5
+        ),
+        logging.StreamHandler(sys.stdout)
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
     logger = logging.getLogger("VoiceGuardMain")
     logger.info("VoiceGuard service environment initialized")
@@ -58,7 +74,7 @@ def setup_service_environment():
 
 def check_prerequisites():
     """Check system prerequisites"""
-    logger = logging.getLogger("Prerequisites")
+    logger = _PREREQ_LOG
     
     # Check Windows version
     import platform
@@ -71,18 +87,21 @@ def check_prerequisites():
         logger.error("Python 3.11 or higher required")
         return False
         
-    # Check required modules
-    required_modules = [
-        'pyaudio', 'numpy', 'scipy', 'aiohttp', 'pywin32'
+    # Check required modules by package name -> importable module; find_spec
+    # locates them without running their (DLL-loading) top-level code
+    required_modules = {
+        'pyaudio': 'pyaudio',
+        'numpy': 'numpy',
+        'scipy': 'scipy',
+        'aiohttp': 'aiohttp',
+        'pywin32': 'win32api'
+    }
+    
+    missing_modules = [
+        package for package, module in required_modules.items()
+        if importlib.util.find_spec(module) is None
     ]
     
-    missing_modules = []
-    for module in required_modules:
-        try:
-            __import__(module)
-        except ImportError:
-            missing_modules.append(module)
-            
     if missing_modules:
         logger.error(f"Missing required modules: {', '.join(missing_modules)}")
         return False
@@ -93,10 +112,11 @@ def check_prerequisites():
 
 def install_service():
     """Install the Windows Service"""
-    logger = logging.getLogger("ServiceInstaller")
+    logger = _INSTALL_LOG
     
     try:
         import win32serviceutil
+        from voiceguard_service import VoiceGuardService
         
         # Install service
         win32serviceutil.InstallService(
@@ -108,15 +128,13 @@ def install_service():
         
         logger.info("VoiceGuard service installed successfully")
         
-        # Configure service recovery
-        import subprocess
-        subprocess.run([
-            'sc', 'failure', VoiceGuardService._svc_name_,
-            'reset=900',  # Reset failure count after 15 minutes
-            'actions=restart/60000/restart/60000/reboot/300000'
-        ], check=False)
-        
-        logger.info("Service recovery configured")
+        # Configure service recovery in-process rather than through sc.exe
+        try:
+            configure_service_recovery()
+            logger.info("Service recovery configured")
+        except Exception as e:
+            logger.warning(f"Service recovery configuration failed: {e}")
+            
         return True
         
     except Exception as e:
@@ -124,22 +142,81 @@ def install_service():
         return False
 
 
+def _enable_shutdown_privilege():
+    """Enable SeShutdownPrivilege, which the reboot recovery action requires"""
+    import win32api
+    import win32con
+    import win32security
+    import winerror
+    
+    token = win32security.OpenProcessToken(
+        win32api.GetCurrentProcess(),
+        win32con.TOKEN_ADJUST_PRIVILEGES | win32con.TOKEN_QUERY
+    )
+    try:
+        luid = win32security.LookupPrivilegeValue(None, win32security.SE_SHUTDOWN_NAME)
+        win32security.AdjustTokenPrivileges(
+            token, False, [(luid, win32security.SE_PRIVILEGE_ENABLED)]
+        )
+        # AdjustTokenPrivileges succeeds even when the privilege was not assigned
+        if win32api.GetLastError() == winerror.ERROR_NOT_ALL_ASSIGNED:
+            raise RuntimeError("SeShutdownPrivilege is not held by this account")
+    finally:
+        win32api.CloseHandle(token)
+
+
+def configure_service_recovery():
+    """Restart the service after failures and reboot if it keeps failing"""
+    import win32service
+    
+    # sc.exe enables this itself; ChangeServiceConfig2 fails with
+    # ERROR_PRIVILEGE_NOT_HELD for SC_ACTION_REBOOT without it
+    _enable_shutdown_privilege()
+    
+    scm_handle = win32service.OpenSCManager(None, None, win32service.SC_MANAGER_CONNECT)
+    try:
+        # SC_ACTION_RESTART needs SERVICE_START on the handle
+        service_handle = win32service.OpenService(
+            scm_handle, _SVC_NAME,
+            win32service.SERVICE_CHANGE_CONFIG | win32service.SERVICE_START
+        )
+        try:
+            win32service.ChangeServiceConfig2(
+                service_handle,
+                win32service.SERVICE_CONFIG_FAILURE_ACTIONS,
+                {
+                    'ResetPeriod': 900,  # Reset failure count after 15 minutes
+                    'RebootMsg': '',
+                    'Command': '',
+                    'Actions': [
+                        (win32service.SC_ACTION_RESTART, 60000),
+                        (win32service.SC_ACTION_RESTART, 60000),
+                        (win32service.SC_ACTION_REBOOT, 300000)
+                    ]
+                }
+            )
+        finally:
+            win32service.CloseServiceHandle(service_handle)
+    finally:
+        win32service.CloseServiceHandle(scm_handle)
+
+
 def remove_service():
     """Remove the Windows Service"""
-    logger = logging.getLogger("ServiceRemover")
+    logger = _REMOVE_LOG
     
     try:
         import win32serviceutil
         
         # Stop service if running
         try:
-            win32serviceutil.StopService(VoiceGuardService._svc_name_)
+            win32serviceutil.StopService(_SVC_NAME)
             logger.info("Service stopped")
         except:
             pass
             
         # Remove service
-        win32serviceutil.RemoveService(VoiceGuardService._svc_name_)
+        win32serviceutil.RemoveService(_SVC_NAME)
         logger.info("VoiceGuard service removed successfully")
         return True
         
@@ -148,52 +225,58 @@ def remove_service():
         return False
 
 
-def start_service():
-    """Start the Windows Service"""
-    logger = logging.getLogger("ServiceStarter")
+# Simple service control commands: win32serviceutil function, logger, outcome
+_SERVICE_ACTIONS = {
+    'start': ('StartService', _START_LOG, "started"),
+    'stop': ('StopService', _STOP_LOG, "stopped")
+}
+
+
+def _service_action(action: str) -> bool:
+    """Run a service control command against the VoiceGuard service"""
+    function_name, logger, outcome = _SERVICE_ACTIONS[action]
     
     try:
         import win32serviceutil
-        win32serviceutil.StartService(VoiceGuardService._svc_name_)
-        logger.info("VoiceGuard service started")
+        getattr(win32serviceutil, function_name)(_SVC_NAME)
+        logger.info(f"VoiceGuard service {outcome}")
         return True
         
     except Exception as e:
-        logger.error(f"Service start failed: {e}")
+        logger.error(f"Service {action} failed: {e}")
         return False
 
 
+def start_service():
+    """Start the Windows Service"""
+    return _service_action('start')
+
+
 def stop_service():
     """Stop the Windows Service"""
-    logger = logging.getLogger("ServiceStopper")
-    
-    try:
-        import win32serviceutil
-        win32serviceutil.StopService(VoiceGuardService._svc_name_)
-        logger.info("VoiceGuard service stopped")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Service stop failed: {e}")
-        return False
+    return _service_action('stop')
 
 
 def run_console_mode():
     """Run service in console mode for debugging"""
-    logger = logging.getLogger("ConsoleMode")
+    logger = _CONSOLE_LOG
     logger.info("Starting VoiceGuard in console mode...")
 
+    # One event loop serves both dependency validation and the service itself
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    try:
+        from dependency_validator import dependency_validator
+    except ImportError:
+        dependency_validator = None
+
     # Validate dependencies before starting service
-    if DEPENDENCY_VALIDATION_AVAILABLE:
+    if dependency_validator is not None:
         logger.info("Validating dependencies for service startup...")
 
         try:
-            import asyncio
-
             # Run dependency validation
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
             validation_ok, validation_results = loop.run_until_complete(
                 dependency_validator.validate_for_service_startup()
             )
@@ -216,8 +299,6 @@ def run_console_mode():
                 validation_results
             )
 
-            loop.close()
-
         except Exception as e:
             logger.error(f"Dependency validation error: {e}")
             logger.warning("Proceeding without dependency validation")
@@ -225,6 +306,7 @@ def run_console_mode():
         logger.warning("Dependency validation not available")
 
     # Create service instance
+    from voiceguard_service import VoiceGuardService
     service = VoiceGuardService([])
 
     # Setup signal handlers for graceful shutdown
@@ -238,13 +320,15 @@ def run_console_mode():
 
     # Run service
     try:
-        service.SvcDoRun()
+        service.SvcDoRun(loop)
     except KeyboardInterrupt:
         logger.info("Interrupted by user")
         service.SvcStop()
     except Exception as e:
         logger.error(f"Service error: {e}")
         sys.exit(1)
+    finally:
+        loop.close()
 
 
 def show_usage():
@@ -273,6 +357,49 @@ Examples:
     """)
 
 
+def _restart_service():
+    """Stop then start the Windows Service"""
+    stop_service()
+    import time
+    time.sleep(2)
+    return start_service()
+
+
+def _debug_console():
+    """Run console mode with debug logging enabled"""
+    logging.getLogger().setLevel(logging.DEBUG)
+    logging.getLogger("VoiceGuardMain").info("Debug mode enabled")
+    run_console_mode()
+
+
+def _show_help():
+    """Show usage information and report success"""
+    show_usage()
+    return True
+
+
+def _handle_service_command():
+    """Hand unrecognised commands to the Windows Service command line handler"""
+    import win32serviceutil
+    from voiceguard_service import VoiceGuardService
+    win32serviceutil.HandleCommandLine(VoiceGuardService)
+
+
+# Command -> (handler, exit with the handler's success status)
+_HANDLERS = {
+    'install': (install_service, True),
+    'remove': (remove_service, True),
+    'start': (start_service, True),
+    'stop': (stop_service, True),
+    'restart': (_restart_service, True),
+    'console': (run_console_mode, False),
+    'debug': (_debug_console, False),
+    'help': (_show_help, True),
+    '--help': (_show_help, True),
+    '-h': (_show_help, True),
+}
+
+
 def main():
     """Main entry point for VoiceGuard service"""
     logger = setup_service_environment()
@@ -286,46 +413,10 @@ def main():
         if len(sys.argv) > 1:
             command = sys.argv[1].lower()
             
-            if command == 'install':
-                success = install_service()
-                sys.exit(0 if success else 1)
-                
-            elif command == 'remove':
-                success = remove_service()
-                sys.exit(0 if success else 1)
-                
-            elif command == 'start':
-                success = start_service()
-                sys.exit(0 if success else 1)
-                
-            elif command == 'stop':
-                success = stop_service()
-                sys.exit(0 if success else 1)
-                
-            elif command == 'restart':
-                stop_service()
-                import time
-                time.sleep(2)
-                success = start_service()
+            handler, needs_exit = _HANDLERS.get(command, (_handle_service_command, False))
+            success = handler()
+            if needs_exit:
                 sys.exit(0 if success else 1)
-                
-            elif command == 'console':
-                run_console_mode()
-                
-            elif command == 'debug':
-                # Enable debug logging
-                logging.getLogger().setLevel(logging.DEBUG)
-                logger.info("Debug mode enabled")
-                run_console_mode()
-                
-            elif command in ['help', '--help', '-h']:
-                show_usage()
-                sys.exit(0)
-                
-            else:
-                # Handle Windows Service commands
-                import win32serviceutil
-                win32serviceutil.HandleCommandLine(VoiceGuardService)
         else:
             # No arguments - run in console mode
             run_console_mode()
@@ -7,21 +7,96 @@ Smart API key rotation client for OpenRouter.ai speech recognition
 import aiohttp
 import asyncio
 import json
-import base64
 import hashlib
 import sqlite3
+import time
+import struct
 import numpy as np
-import io
-import wave
-from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, List
+from datetime import date, datetime, timezone, timedelta
+from typing import Optional, Dict, List, Tuple, Any
 from pathlib import Path
 import logging
+import functools
+
+try:
+    import httpx
+    import h2  # noqa: F401 - required for httpx HTTP/2 support
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# Multipart fields sent with every transcription request
+_FORM_FIELDS = {
+    'model': 'openai/whisper-large-v3',
+    'response_format': 'json',
+    'language': 'en'
+}
+
+# Exceptions that mean the request timed out, for either HTTP backend
+_TIMEOUT_ERRORS = (asyncio.TimeoutError, httpx.TimeoutException) if HTTPX_AVAILABLE else (asyncio.TimeoutError,)
+
+_UPDATE_USAGE_SQL = "UPDATE api_keys SET daily_usage = ?, last_used = ? WHERE id = ?"
+_RESET_DAILY_SQL = "UPDATE api_keys SET daily_usage = 0, last_reset_date = ? WHERE last_reset_date < ?"
+
+# Seconds usage updates are held before being written in one transaction
+_USAGE_FLUSH_DELAY = 1.0
+
+# RIFF/WAVE header for mono 16-bit PCM: sizes, sample rate and byte rate are filled per call
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+
+def _float_to_int16(src: np.ndarray, dst: np.ndarray):
+    """Clip float samples to [-1, 1] and scale them into int16 in one pass"""
+    for i in range(src.shape[0]):
+        # Scale in float64 whatever the input dtype, matching _float_to_int16_numpy
+        value = np.float64(src[i])
+        if value > 1.0:
+            value = 1.0
+        elif value < -1.0:
+            value = -1.0
+        dst[i] = int(value * 32767.0)
+
+
+def _float_to_int16_numpy(src: np.ndarray, dst: np.ndarray):
+    """NumPy equivalent of _float_to_int16 for when numba is not installed"""
+    clipped = np.clip(src, -1.0, 1.0, dtype=np.float64)
+    np.multiply(clipped, 32767.0, out=dst, casting='unsafe')
+
+
+if NUMBA_AVAILABLE:
+    _float_to_int16 = njit(cache=True)(_float_to_int16)
+
+
+# Minimum seconds between two requests on the same key
+_KEY_COOLDOWN = 6.0
+
+# Seconds a test_api_key result is reused for the same key
+_KEY_TEST_TTL = 300.0
+
+# Decrypted API keys by key_hash, kept across load_api_keys calls
+_DECRYPT_CACHE: Dict[str, str] = {}
+
+
+@functools.lru_cache(maxsize=1)
+def _config_manager():
+    """Return the process-wide ConfigurationManager used for key decryption"""
+    # decrypt_value is a stateless DPAPI call, so sharing one instance is safe
+    from config_manager import ConfigurationManager
+    return ConfigurationManager()
 
 
 class OpenRouterClient:
     """Smart API key rotation client for OpenRouter.ai"""
     
+    # 1 second of silence used by test_api_key, built on first use
+    _test_audio_wav: Optional[bytes] = None
+    
     def __init__(self):
         self.api_keys = []
         self.current_key_index = 0
@@ -31,60 +106,103 @@ class OpenRouterClient:
         self.db_path = Path("C:/ProgramData/VoiceGuard/config.db")
         self.logger = logging.getLogger("OpenRouterClient")
         
+        # Usage updates are coalesced per key and written in batches
+        self._db_conn = None
+        self._pending_usage: Dict[int, tuple] = {}
+        self._flush_handle = None
+        
+        # Date the daily counters were last checked for a reset
+        self._last_reset_check_date = None
+        
+        # Callers waiting for a key to leave its cooldown share one condition
+        self._key_cond = asyncio.Condition()
+        
+        # Scratch space for building WAV payloads, grown on demand
+        self._wav_buf = bytearray(2 * 1024 * 1024)
+        
+        # api_key -> (monotonic time tested, result)
+        self._test_cache: Dict[str, tuple] = {}
+        
     async def initialize(self):
         """Initialize OpenRouter client with API keys"""
         # Create HTTP session with optimized settings
-        timeout = aiohttp.ClientTimeout(total=5.0, connect=2.0)
-        connector = aiohttp.TCPConnector(
-            limit=10,
-            limit_per_host=5,
-            keepalive_timeout=30,
-            enable_cleanup_closed=True
-        )
-        
-        self.session = aiohttp.ClientSession(
-            timeout=timeout,
-            connector=connector,
-            headers={
-                'User-Agent': 'VoiceGuard/1.0',
-                'Content-Type': 'application/json'
-            }
-        )
+        if HTTPX_AVAILABLE:
+            # HTTP/2 multiplexes concurrent requests over one TLS connection
+            self.session = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(5.0, connect=2.0),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+                headers={
+                    'User-Agent': 'VoiceGuard/1.0'
+                }
+            )
+        else:
+            timeout = aiohttp.ClientTimeout(total=5.0, connect=2.0)
+            connector = aiohttp.TCPConnector(
+                limit=10,
+                limit_per_host=5,
+                keepalive_timeout=30,
+                enable_cleanup_closed=True
+            )
+            
+            self.session = aiohttp.ClientSession(
+                timeout=timeout,
+                connector=connector,
+                headers={
+                    'User-Agent': 'VoiceGuard/1.0'
+                }
+            )
         
         # Load API keys from database
         await self.load_api_keys()
         
+    def _get_connection(self) -> sqlite3.Connection:
+        """Return the shared database connection, opening it on first use"""
+        if self._db_conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._db_conn = conn
+        return self._db_conn
+        
     async def load_api_keys(self):
         """Load and decrypt API keys from database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    "SELECT id, key_hash, encrypted_key, daily_usage, last_reset_date, is_active "
-                    "FROM api_keys WHERE is_active = 1 ORDER BY daily_usage ASC"
-                )
+            conn = self._get_connection()
+            cursor = conn.execute(
+                "SELECT id, key_hash, encrypted_key, daily_usage, last_reset_date, is_active "
+                "FROM api_keys WHERE is_active = 1 ORDER BY daily_usage ASC"
+            )
+            
+            self.api_keys = []
+            for row in cursor.fetchall():
+                key_id, key_hash, encrypted_key, daily_usage, last_reset_date, is_active = row
                 
-                self.api_keys = []
-                for row in cursor.fetchall():
-                    key_id, key_hash, encrypted_key, daily_usage, last_reset_date, is_active = row
-                    
-                    # Decrypt API key
-                    try:
-                        from config_manager import ConfigurationManager
-                        config_manager = ConfigurationManager()
-                        decrypted_key = config_manager.decrypt_value(encrypted_key)
-                        
-                        self.api_keys.append({
-                            'id': key_id,
-                            'key': decrypted_key,
-                            'hash': key_hash,
-                            'daily_usage': daily_usage,
-                            'last_reset_date': datetime.fromisoformat(last_reset_date).date(),
-                            'last_used': None
-                        })
-                    except Exception as e:
-                        self.logger.error(f"Failed to decrypt API key {key_id}: {e}")
+                # Decrypt API key, reusing earlier results for known hashes
+                try:
+                    decrypted_key = _DECRYPT_CACHE.get(key_hash)
+                    if decrypted_key is None:
+                        decrypted_key = _config_manager().decrypt_value(encrypted_key)
+                        _DECRYPT_CACHE[key_hash] = decrypted_key
                         
+                    self.api_keys.append({
+                        'id': key_id,
+                        'key': decrypted_key,
+                        'hash': key_hash,
+                        'daily_usage': daily_usage,
+                        'last_reset_date': date.fromisoformat(last_reset_date[:10]),
+                        'last_used_ts': 0.0
+                    })
+                except Exception as e:
+                    self.logger.error(f"Failed to decrypt API key {key_id}: {e}")
+                    
             self.logger.info(f"Loaded {len(self.api_keys)} API keys")
+            self._last_reset_check_date = None
+            
+            # Wake callers waiting on the previous key set
+            async with self._key_cond:
+                self._key_cond.notify_all()
             
         except Exception as e:
             self.logger.error(f"Failed to load API keys: {e}")
@@ -95,41 +213,50 @@ class OpenRouterClient:
         if not self.api_keys:
             return None
             
-        current_date = datetime.now(timezone.utc).date()
-        
-        # Reset daily counters if new day
-        for key in self.api_keys:
-            if key['last_reset_date'] < current_date:
-                key['daily_usage'] = 0
-                key['last_reset_date'] = current_date
-                await self.update_key_usage(key['id'], 0, current_date)
-        
-        # Find available keys (not at daily limit)
-        available_keys = [
-            key for key in self.api_keys 
-            if key['daily_usage'] < self.daily_limit
-        ]
-        
-        if not available_keys:
-            return None  # All keys exhausted
-            
-        # Rate limiting: don't use same key within 6 seconds
-        now = datetime.now(timezone.utc)
-        available_keys = [
-            key for key in available_keys
-            if not key['last_used'] or (now - key['last_used']).total_seconds() >= 6
-        ]
-        
-        if not available_keys:
-            # Wait for rate limit to clear
-            await asyncio.sleep(1)
-            return await self.get_available_key()
-            
-        # Select key with lowest usage (load balancing)
-        selected_key = min(available_keys, key=lambda k: k['daily_usage'])
-        selected_key['last_used'] = now
-        
-        return selected_key
+        async with self._key_cond:
+            while True:
+                now = datetime.now(timezone.utc)
+                today = now.date()
+                now_ts = now.timestamp()
+                
+                # Reset daily counters if new day
+                if self._last_reset_check_date != today:
+                    stale_keys = [key for key in self.api_keys if key['last_reset_date'] < today]
+                    if stale_keys:
+                        self._reset_daily_usage(today)
+                        for key in stale_keys:
+                            key['daily_usage'] = 0
+                            key['last_reset_date'] = today
+                    self._last_reset_check_date = today
+                
+                # One pass: keys under the daily limit, split by the 6 second cooldown
+                selected_key = None
+                any_available = False
+                wait = _KEY_COOLDOWN
+                for key in self.api_keys:
+                    if key['daily_usage'] >= self.daily_limit:
+                        continue
+                    any_available = True
+                    remaining = _KEY_COOLDOWN - (now_ts - key['last_used_ts'])
+                    if remaining <= 0:
+                        # Select key with lowest usage (load balancing)
+                        if selected_key is None or key['daily_usage'] < selected_key['daily_usage']:
+                            selected_key = key
+                    elif remaining < wait:
+                        wait = remaining
+                        
+                if selected_key is not None:
+                    selected_key['last_used_ts'] = now_ts
+                    return selected_key
+                    
+                if not any_available:
+                    return None  # All keys exhausted
+                    
+                # Release the lock until the earliest key clears its cooldown
+                try:
+                    await asyncio.wait_for(self._key_cond.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
         
     async def transcribe_audio(self, audio_data: np.ndarray, sample_rate: int) -> Optional[Dict]:
         """Transcribe audio using OpenRouter.ai Whisper"""
@@ -142,16 +269,6 @@ class OpenRouterClient:
                 
             # Convert audio to WAV format for API
             audio_bytes = self.audio_to_wav_bytes(audio_data, sample_rate)
-            audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
-            
-            # Prepare API request
-            payload = {
-                'model': 'openai/whisper-large-v3',
-                'audio': audio_b64,
-                'response_format': 'json',
-                'language': 'en',
-                'temperature': 0.0  # Deterministic output
-            }
             
             headers = {
                 'Authorization': f'Bearer {api_key["key"]}',
@@ -160,39 +277,34 @@ class OpenRouterClient:
             }
             
             # Make API request
-            async with self.session.post(
-                f"{self.base_url}/audio/transcriptions",
-                json=payload,
-                headers=headers
-            ) as response:
+            status, result = await self.post_transcription(
+                audio_bytes, headers, temperature='0.0'  # Deterministic output
+            )
+            
+            if status == 200:
+                # Update key usage
+                api_key['daily_usage'] += 1
+                await self.update_key_usage(api_key['id'], api_key['daily_usage'])
                 
-                if response.status == 200:
-                    result = await response.json()
-                    
-                    # Update key usage
-                    api_key['daily_usage'] += 1
-                    await self.update_key_usage(api_key['id'], api_key['daily_usage'])
-                    
-                    return {
-                        'text': result.get('text', '').strip(),
-                        'confidence': 0.9,  # OpenRouter doesn't provide confidence
-                        'source': 'openrouter',
-                        'model': 'whisper-large-v3'
-                    }
-                    
-                elif response.status == 429:
-                    # Rate limited - mark key as temporarily unavailable
-                    api_key['daily_usage'] = self.daily_limit
-                    await self.update_key_usage(api_key['id'], self.daily_limit)
-                    self.logger.warning(f"API key {api_key['hash']} rate limited")
-                    return None
-                    
-                else:
-                    error_text = await response.text()
-                    self.logger.warning(f"OpenRouter API error {response.status}: {error_text}")
-                    return None
-                    
-        except asyncio.TimeoutError:
+                return {
+                    'text': result.get('text', '').strip(),
+                    'confidence': 0.9,  # OpenRouter doesn't provide confidence
+                    'source': 'openrouter',
+                    'model': 'whisper-large-v3'
+                }
+                
+            elif status == 429:
+                # Rate limited - mark key as temporarily unavailable
+                api_key['daily_usage'] = self.daily_limit
+                await self.update_key_usage(api_key['id'], self.daily_limit)
+                self.logger.warning(f"API key {api_key['hash']} rate limited")
+                return None
+                
+            else:
+                self.logger.warning(f"OpenRouter API error {status}: {result}")
+                return None
+                
+        except _TIMEOUT_ERRORS:
             self.logger.warning("OpenRouter API timeout")
             return None
         except Exception as e:
@@ -201,38 +313,95 @@ class OpenRouterClient:
             
     def audio_to_wav_bytes(self, audio_data: np.ndarray, sample_rate: int) -> bytes:
         """Convert numpy audio array to WAV bytes"""
-        # Ensure audio is 16-bit
+        data_len = audio_data.size * 2
+        total_len = _WAV_HEADER.size + data_len
+        if len(self._wav_buf) < total_len:
+            self._wav_buf = bytearray(total_len)
+            
+        # Mono 16-bit PCM header followed by the samples, assembled in the
+        # reusable buffer; the only per-call allocation is the returned copy
+        _WAV_HEADER.pack_into(
+            self._wav_buf, 0,
+            b'RIFF', 36 + data_len, b'WAVE',
+            b'fmt ', 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+            b'data', data_len
+        )
+        pcm = np.frombuffer(self._wav_buf, dtype=np.int16, count=audio_data.size, offset=_WAV_HEADER.size)
         if audio_data.dtype != np.int16:
-            audio_data = (audio_data * 32767).astype(np.int16)
+            # Ensure audio is 16-bit, scaling straight into the buffer
+            if NUMBA_AVAILABLE:
+                _float_to_int16(audio_data.ravel(), pcm)
+            else:
+                _float_to_int16_numpy(audio_data.ravel(), pcm)
+        else:
+            pcm[:] = audio_data.ravel()
             
-        # Create WAV file in memory
-        wav_buffer = io.BytesIO()
-        with wave.open(wav_buffer, 'wb') as wav_file:
-            wav_file.setnchannels(1)  # Mono
-            wav_file.setsampwidth(2)  # 16-bit
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(audio_data.tobytes())
+        return bytes(memoryview(self._wav_buf)[:total_len])
+        
+    async def post_transcription(self, audio_bytes: bytes, headers: Dict, **fields: str) -> Tuple[int, Any]:
+        """POST WAV bytes as multipart; returns (status, JSON body on 200 else response text)"""
+        url = f"{self.base_url}/audio/transcriptions"
+        
+        if HTTPX_AVAILABLE:
+            response = await self.session.post(
+                url,
+                data={**_FORM_FIELDS, **fields},
+                files={'file': ('audio.wav', audio_bytes, 'audio/wav')},
+                headers=headers
+            )
+            if response.status_code == 200:
+                return 200, response.json()
+            return response.status_code, response.text
+            
+        form = aiohttp.FormData()
+        form.add_field('file', audio_bytes, filename='audio.wav', content_type='audio/wav')
+        for name, value in {**_FORM_FIELDS, **fields}.items():
+            form.add_field(name, value)
             
-        return wav_buffer.getvalue()
+        async with self.session.post(url, data=form, headers=headers) as response:
+            if response.status == 200:
+                return 200, await response.json()
+            return response.status, await response.text()
+        
+    async def update_key_usage(self, key_id: int, usage: int):
+        """Queue an API key usage update for the next batched database write"""
+        self._pending_usage[key_id] = (usage, datetime.now(timezone.utc).isoformat(), key_id)
+        
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                _USAGE_FLUSH_DELAY, self._flush_usage
+            )
+            
+    def _flush_usage(self):
+        """Write all pending usage updates in a single transaction"""
+        self._flush_handle = None
+        if not self._pending_usage:
+            return
+            
+        updates = list(self._pending_usage.values())
+        self._pending_usage.clear()
         
-    async def update_key_usage(self, key_id: int, usage: int, reset_date: Optional[datetime.date] = None):
-        """Update API key usage in database"""
         try:
-            if reset_date:
-                with sqlite3.connect(self.db_path) as conn:
-                    conn.execute(
-                        "UPDATE api_keys SET daily_usage = ?, last_reset_date = ?, last_used = ? WHERE id = ?",
-                        (usage, reset_date.isoformat(), datetime.now(timezone.utc).isoformat(), key_id)
-                    )
-            else:
-                with sqlite3.connect(self.db_path) as conn:
-                    conn.execute(
-                        "UPDATE api_keys SET daily_usage = ?, last_used = ? WHERE id = ?",
-                        (usage, datetime.now(timezone.utc).isoformat(), key_id)
-                    )
+            conn = self._get_connection()
+            with conn:
+                conn.executemany(_UPDATE_USAGE_SQL, updates)
         except Exception as e:
             self.logger.error(f"Failed to update key usage: {e}")
             
+    def _reset_daily_usage(self, today):
+        """Zero the usage of every key not yet reset today in one statement"""
+        # Usage still pending predates the reset and must land first
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_usage()
+        
+        try:
+            conn = self._get_connection()
+            with conn:
+                conn.execute(_RESET_DAILY_SQL, (today.isoformat(), today.isoformat()))
+        except Exception as e:
+            self.logger.error(f"Failed to reset daily key usage: {e}")
+            
     async def get_status(self) -> Dict:
         """Get current API key status"""
         if not self.api_keys:
@@ -258,18 +427,15 @@ class OpenRouterClient:
         
     async def test_api_key(self, api_key: str) -> bool:
         """Test if an API key is valid"""
+        hit = self._test_cache.get(api_key)
+        if hit and time.monotonic() - hit[0] < _KEY_TEST_TTL:
+            return hit[1]
+            
         try:
             # Create a small test audio (1 second of silence)
-            test_audio = np.zeros(16000, dtype=np.int16)
-            audio_bytes = self.audio_to_wav_bytes(test_audio, 16000)
-            audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
-            
-            payload = {
-                'model': 'openai/whisper-large-v3',
-                'audio': audio_b64,
-                'response_format': 'json',
-                'language': 'en'
-            }
+            if OpenRouterClient._test_audio_wav is None:
+                test_audio = np.zeros(16000, dtype=np.int16)
+                OpenRouterClient._test_audio_wav = self.audio_to_wav_bytes(test_audio, 16000)
             
             headers = {
                 'Authorization': f'Bearer {api_key}',
@@ -277,19 +443,31 @@ class OpenRouterClient:
                 'X-Title': 'VoiceGuard Test'
             }
             
-            async with self.session.post(
-                f"{self.base_url}/audio/transcriptions",
-                json=payload,
-                headers=headers
-            ) as response:
-                return response.status == 200
-                
+            status, _ = await self.post_transcription(OpenRouterClient._test_audio_wav, headers)
+            result = status == 200
+            
+            # Only definitive answers are cached; rate limits and server
+            # errors say nothing about the key itself
+            if result or status in (401, 403):
+                self._test_cache[api_key] = (time.monotonic(), result)
+            return result
+            
         except Exception as e:
             self.logger.error(f"API key test error: {e}")
             return False
             
     async def cleanup(self):
         """Cleanup resources"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_usage()
+        if self._db_conn is not None:
+            self._db_conn.close()
+            self._db_conn = None
+            
         if self.session:
-            await self.session.close()
+            if HTTPX_AVAILABLE:
+                await self.session.aclose()
+            else:
+                await self.session.close()
             self.session = None
@@ -5,28 +5,45 @@ System tray integration for VoiceGuard status monitoring
 """
 
 import sys
+import json
 import threading
 import logging
 from pathlib import Path
 from datetime import datetime
 import subprocess
+from typing import Dict
+
+from ipc_communication import TRAY_PIPE_NAME
 
 try:
     from PyQt6.QtWidgets import (QApplication, QSystemTrayIcon, QMenu, QAction, 
                                 QMessageBox, QWidget)
     from PyQt6.QtCore import QTimer, pyqtSignal, QObject, QThread
-    from PyQt6.QtGui import QIcon, QPixmap
+    from PyQt6.QtGui import QIcon, QPixmap, QColor
+    from PyQt6.QtNetwork import QLocalServer
     PYQT_AVAILABLE = True
 except ImportError:
     PYQT_AVAILABLE = False
     print("PyQt6 not available - system tray will not work")
 
-try:
-    from PIL import Image, ImageDraw
-    import io
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
+# Pre-rendered 32x32 status icons, one PNG per status plus default.png
+_ICON_DIR = Path(__file__).parent / "icons"
+
+
+class ServiceControlWorker(QThread):
+    """Restart the VoiceGuard service without blocking the GUI thread"""
+    
+    # success, error message
+    result = pyqtSignal(bool, str)
+    
+    def run(self):
+        """Stop and start the service through sc"""
+        try:
+            subprocess.run(['sc', 'stop', 'VoiceGuardService'], check=False)
+            subprocess.run(['sc', 'start', 'VoiceGuardService'], check=True)
+            self.result.emit(True, "")
+        except Exception as e:
+            self.result.emit(False, str(e))
 
 
 class SystemTrayApp(QObject):
@@ -36,6 +53,20 @@ class SystemTrayApp(QObject):
     status_changed = pyqtSignal(str)
     command_detected = pyqtSignal(str, float)
     
+    # Icon color and tooltip per status
+    _ICON_COLORS = {
+        'active': (40, 167, 69),      # Green
+        'warning': (255, 193, 7),     # Yellow
+        'inactive': (220, 53, 69),    # Red
+        'test_mode': (23, 162, 184)   # Blue
+    }
+    _TOOLTIPS = {
+        'active': 'VoiceGuard Active - Monitoring for commands',
+        'warning': 'VoiceGuard Warning - Check configuration',
+        'inactive': 'VoiceGuard Inactive - Service not running',
+        'test_mode': 'VoiceGuard Test Mode - Commands logged only'
+    }
+    
     def __init__(self):
         super().__init__()
         self.app = None
@@ -50,6 +81,15 @@ class SystemTrayApp(QObject):
         self.api_keys_active = 0
         self.test_mode = False
         
+        # Rendered icons by status
+        self._icon_cache = {}
+        
+        # State last rendered by update_status
+        self._last_status_sig = None
+        
+        # Running service restart, if any
+        self._service_worker = None
+        
         if not PYQT_AVAILABLE:
             self.logger.error("PyQt6 not available - system tray disabled")
             return
@@ -74,16 +114,69 @@ class SystemTrayApp(QObject):
             # Create system tray icon
             self.create_tray_icon()
             
-            # Start status update timer
+            # Status is pushed by the service; the timer only covers missed pushes
+            self.start_status_server()
             self.status_timer = QTimer()
             self.status_timer.timeout.connect(self.update_status)
-            self.status_timer.start(5000)  # Update every 5 seconds
+            self.status_timer.start(60000)  # Fallback refresh every 60 seconds
+            
+            # Keeps the "Ns ago" / "Nm ago" text current while the command is recent
+            self.last_command_timer = QTimer()
+            self.last_command_timer.timeout.connect(self.refresh_last_command)
             
             self.logger.info("System tray started")
             
         except Exception as e:
             self.logger.error(f"System tray start error: {e}")
             
+    def start_status_server(self):
+        """Listen for status packets pushed by the service"""
+        try:
+            self.status_server = QLocalServer(self)
+            # The service runs as another user and must be able to connect
+            self.status_server.setSocketOptions(QLocalServer.SocketOption.WorldAccessOption)
+            QLocalServer.removeServer(TRAY_PIPE_NAME)
+            
+            if not self.status_server.listen(TRAY_PIPE_NAME):
+                self.logger.warning(f"Status server listen failed: {self.status_server.errorString()}")
+                return
+                
+            self.status_server.newConnection.connect(self.on_status_connection)
+            
+        except Exception as e:
+            self.logger.error(f"Status server start error: {e}")
+            
+    def on_status_connection(self):
+        """Accept pending status connections"""
+        while self.status_server.hasPendingConnections():
+            socket = self.status_server.nextPendingConnection()
+            socket.readyRead.connect(lambda s=socket: self.read_status_packets(s))
+            # Pick up anything still buffered when the sender hangs up
+            socket.disconnected.connect(lambda s=socket: self.read_status_packets(s))
+            socket.disconnected.connect(socket.deleteLater)
+            
+    def read_status_packets(self, socket):
+        """Apply every complete status line available on a connection"""
+        while socket.canReadLine():
+            line = bytes(socket.readLine())
+            try:
+                self.apply_status(json.loads(line))
+            except (ValueError, TypeError) as e:
+                self.logger.warning(f"Invalid status packet: {e}")
+                
+    def apply_status(self, status: Dict):
+        """Update tracked state from a pushed status packet and redraw"""
+        for field in ('service_running', 'helper_running', 'test_mode', 'api_keys_active'):
+            if field in status:
+                setattr(self, field, status[field])
+        if 'last_command_time' in status:
+            self.last_command_time = datetime.fromisoformat(status['last_command_time'])
+            if hasattr(self, 'last_command_timer'):
+                self.last_command_timer.start(1000)
+            
+        self.update_status()
+        self.status_changed.emit(self.current_status)
+        
     def create_tray_icon(self):
         """Create and configure system tray icon"""
         try:
@@ -175,106 +268,78 @@ class SystemTrayApp(QObject):
     def update_tray_icon(self, status: str):
         """Update tray icon based on status"""
         try:
-            # Create icon based on status
-            icon_color = {
-                'active': (40, 167, 69),      # Green
-                'warning': (255, 193, 7),     # Yellow
-                'inactive': (220, 53, 69),    # Red
-                'test_mode': (23, 162, 184)   # Blue
-            }.get(status, (108, 117, 125))    # Gray default
-            
-            # Create icon image
-            if PIL_AVAILABLE:
-                icon_image = self.create_icon_image(icon_color)
-                qicon = self.pil_to_qicon(icon_image)
-            else:
-                # Fallback to simple colored icon
-                qicon = self.create_simple_icon(icon_color)
+            qicon = self._icon_cache.get(status)
+            if qicon is None:
+                # Load the shipped icon for this status
+                icon_path = _ICON_DIR / f"{status if status in self._ICON_COLORS else 'default'}.png"
+                if icon_path.exists():
+                    qicon = QIcon(str(icon_path))
+                else:
+                    # Fallback to simple colored icon
+                    qicon = self.create_simple_icon(self._ICON_COLORS.get(status, (108, 117, 125)))  # Gray default
+                self._icon_cache[status] = qicon
                 
             self.tray_icon.setIcon(qicon)
             
             # Update tooltip
-            tooltip = {
-                'active': 'VoiceGuard Active - Monitoring for commands',
-                'warning': 'VoiceGuard Warning - Check configuration',
-                'inactive': 'VoiceGuard Inactive - Service not running',
-                'test_mode': 'VoiceGuard Test Mode - Commands logged only'
-            }.get(status, 'VoiceGuard - Unknown status')
-            
-            self.tray_icon.setToolTip(tooltip)
+            self.tray_icon.setToolTip(self._TOOLTIPS.get(status, 'VoiceGuard - Unknown status'))
             
             self.current_status = status
             
         except Exception as e:
             self.logger.error(f"Tray icon update error: {e}")
             
-    def create_icon_image(self, color: tuple) -> Image.Image:
-        """Create microphone icon image"""
-        if not PIL_AVAILABLE:
-            return None
-            
-        # Create 32x32 icon
-        img = Image.new('RGBA', (32, 32), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-        
-        # Draw microphone shape
-        # Microphone body (rectangle with rounded corners)
-        draw.rounded_rectangle([10, 6, 22, 20], radius=3, fill=color)
-        
-        # Microphone stand
-        draw.rectangle([15, 20, 17, 26], fill=color)
-        
-        # Microphone base
-        draw.ellipse([12, 24, 20, 28], fill=color)
-        
-        return img
-        
-    def pil_to_qicon(self, pil_image: Image.Image) -> QIcon:
-        """Convert PIL image to QIcon"""
-        if not PIL_AVAILABLE or not pil_image:
-            return QIcon()
-            
-        # Convert PIL image to bytes
-        img_buffer = io.BytesIO()
-        pil_image.save(img_buffer, format='PNG')
-        img_bytes = img_buffer.getvalue()
-        
-        # Create QPixmap from bytes
-        pixmap = QPixmap()
-        pixmap.loadFromData(img_bytes)
-        
-        return QIcon(pixmap)
-        
     def create_simple_icon(self, color: tuple) -> QIcon:
-        """Create simple colored icon without PIL"""
+        """Create simple colored icon when the icon files are missing"""
         # Create a simple colored square as fallback
         pixmap = QPixmap(32, 32)
         pixmap.fill(QColor(*color))
         return QIcon(pixmap)
         
+    def _last_command_text(self) -> str:
+        """Format the last command menu entry"""
+        if not self.last_command_time:
+            return "📊 Last Command: Never"
+            
+        time_diff = (datetime.now() - self.last_command_time).total_seconds()
+        if time_diff < 60:
+            time_str = f"{int(time_diff)}s ago"
+        elif time_diff < 3600:
+            time_str = f"{int(time_diff/60)}m ago"
+        else:
+            time_str = f"{int(time_diff/3600)}h ago"
+        return f"📊 Last Command: {time_str}"
+        
+    def refresh_last_command(self):
+        """Refresh only the last command age; stops once it reads in hours"""
+        if not self.last_command_time or \
+                (datetime.now() - self.last_command_time).total_seconds() >= 3600:
+            self.last_command_timer.stop()
+            
+        if hasattr(self, 'last_command_action'):
+            self.last_command_action.setText(self._last_command_text())
+            
     def update_status(self):
         """Update system status and tray icon"""
         try:
             # Check service status (placeholder - would check actual service)
             # In real implementation, this would query the service via IPC
             
+            # Nothing to redraw unless the state or the displayed age changed
+            last_command_text = self._last_command_text()
+            sig = (self.service_running, self.helper_running, self.test_mode,
+                   self.api_keys_active, last_command_text)
+            if sig == self._last_status_sig:
+                return
+            self._last_status_sig = sig
+            
             # Update context menu text
             if hasattr(self, 'service_status_action'):
                 status_text = "● Service Status: Active" if self.service_running else "● Service Status: Inactive"
                 self.service_status_action.setText(status_text)
                 
             if hasattr(self, 'last_command_action'):
-                if self.last_command_time:
-                    time_diff = (datetime.now() - self.last_command_time).total_seconds()
-                    if time_diff < 60:
-                        time_str = f"{int(time_diff)}s ago"
-                    elif time_diff < 3600:
-                        time_str = f"{int(time_diff/60)}m ago"
-                    else:
-                        time_str = f"{int(time_diff/3600)}h ago"
-                    self.last_command_action.setText(f"📊 Last Command: {time_str}")
-                else:
-                    self.last_command_action.setText("📊 Last Command: Never")
+                self.last_command_action.setText(last_command_text)
                     
             if hasattr(self, 'api_keys_action'):
                 self.api_keys_action.setText(f"🔑 API Keys: {self.api_keys_active}/30 active")
@@ -352,12 +417,19 @@ class SystemTrayApp(QObject):
             
     def restart_service(self):
         """Restart VoiceGuard service"""
-        try:
-            subprocess.run(['sc', 'stop', 'VoiceGuardService'], check=False)
-            subprocess.run(['sc', 'start', 'VoiceGuardService'], check=True)
+        if self._service_worker and self._service_worker.isRunning():
+            return
+            
+        self._service_worker = ServiceControlWorker()
+        self._service_worker.result.connect(self.on_service_restarted)
+        self._service_worker.start()
+        
+    def on_service_restarted(self, success: bool, error: str):
+        """Report the outcome of a service restart"""
+        if success:
             self.show_notification("Service", "VoiceGuard service restarted", "info")
-        except Exception as e:
-            self.logger.error(f"Restart service error: {e}")
+        else:
+            self.logger.error(f"Restart service error: {error}")
             self.show_notification("Error", "Failed to restart service", "warning")
             
     def pause_monitoring(self):
@@ -392,6 +464,8 @@ class SystemTrayApp(QObject):
                 
     def quit(self):
         """Quit the system tray application"""
+        if getattr(self, 'status_server', None):
+            self.status_server.close()
         if self.tray_icon:
             self.tray_icon.hide()
         if self.app:
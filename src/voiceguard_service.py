@@ -19,7 +19,7 @@ import threading
 from typing import Dict, List, Optional
 
 from config_manager import ConfigurationManager
-from ipc_communication import IPCServer
+from ipc_communication import IPCServer, push_tray_status
 from watchdog_system import WatchdogManager
 from event_logger import EventLogger
 
@@ -40,6 +40,17 @@ class VoiceGuardService(win32serviceutil.ServiceFramework):
         self.watchdog = WatchdogManager()
         self.event_logger = EventLogger()
         
+        # Service loop and the event SvcStop uses to wake it
+        self._loop = None
+        self._stop_event = None
+        
+        # IPC message type -> handler coroutine
+        self._message_handlers = {
+            "COMMAND_DETECTED": self.handle_shutdown_command,
+            "STATUS_UPDATE": self.handle_status_update,
+            "CONFIG_CHANGE": self.handle_config_change
+        }
+        
         # Initialize logging
         self.setup_logging()
         
@@ -68,9 +79,11 @@ class VoiceGuardService(win32serviceutil.ServiceFramework):
         self.ReportServiceStatus(win32service.SERVICE_STOP_PENDING)
         self.is_running = False
         win32event.SetEvent(self.hWaitStop)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
         
-    def SvcDoRun(self):
-        """Main service execution"""
+    def SvcDoRun(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Main service execution, optionally on a caller-owned event loop"""
         self.logger.info("VoiceGuard Service starting...")
         self.is_running = True
         
@@ -78,13 +91,15 @@ class VoiceGuardService(win32serviceutil.ServiceFramework):
             # Initialize components
             self.config_manager.initialize()
             self.ipc_server.start()
-            self.watchdog.start()
             
             # Log service start
             self.event_logger.log_security_event(1001, "Service Started")
             
             # Main service loop
-            asyncio.run(self.main_service_loop())
+            if loop is not None:
+                loop.run_until_complete(self.main_service_loop())
+            else:
+                asyncio.run(self.main_service_loop())
             
         except Exception as e:
             self.logger.error(f"Service error: {e}")
@@ -94,35 +109,73 @@ class VoiceGuardService(win32serviceutil.ServiceFramework):
             
     async def main_service_loop(self):
         """Main asynchronous service loop"""
+        self._stop_event = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        
+        # Started here so watchdog recoveries can be scheduled on this loop
+        self.watchdog.start(self._loop)
+        self.notify_tray({'service_running': True})
+        
+        # Periodic checks run on their own so they never delay a message
+        health_task = asyncio.create_task(self.run_periodic_checks())
+        stop_wait = asyncio.create_task(self._stop_event.wait())
+        
+        try:
+            while self.is_running:
+                try:
+                    # Process IPC messages as soon as they arrive
+                    process_task = asyncio.create_task(self.process_ipc_messages())
+                    await asyncio.wait({process_task, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+                    
+                    if not process_task.done():
+                        # Stop requested while waiting
+                        process_task.cancel()
+                        break
+                    process_task.result()
+                    
+                except Exception as e:
+                    self.logger.error(f"Main loop error: {e}")
+                    await asyncio.sleep(5)  # Longer sleep on error
+        finally:
+            health_task.cancel()
+            stop_wait.cancel()
+            self.notify_tray({'service_running': False})
+            
+    def notify_tray(self, status: Dict):
+        """Push a status update to the system tray off the event loop"""
+        # The pipe open/write blocks, so it runs on the default executor
+        self._loop.run_in_executor(None, push_tray_status, status)
+            
+    async def run_periodic_checks(self):
+        """Run health and watchdog checks every 30 seconds"""
         while self.is_running:
             try:
-                # Process IPC messages
-                await self.process_ipc_messages()
-                
                 # Check system health
                 await self.perform_health_checks()
                 
                 # Monitor watchdog status
                 await self.check_watchdog_status()
                 
-                # Sleep for 1 second
-                await asyncio.sleep(1)
-                
             except Exception as e:
-                self.logger.error(f"Main loop error: {e}")
-                await asyncio.sleep(5)  # Longer sleep on error
+                self.logger.error(f"Periodic check error: {e}")
+                
+            await asyncio.sleep(30)
                 
     async def process_ipc_messages(self):
         """Process incoming IPC messages from helper process"""
-        messages = await self.ipc_server.get_pending_messages()
-        
-        for message in messages:
-            if message.type == "COMMAND_DETECTED":
-                await self.handle_shutdown_command(message)
-            elif message.type == "STATUS_UPDATE":
-                await self.handle_status_update(message)
-            elif message.type == "CONFIG_CHANGE":
-                await self.handle_config_change(message)
+        messages = await self.ipc_server.get_pending_messages(wait=True)
+        handlers = self._message_handlers
+        
+        # Handle a burst concurrently; one failing handler must not cancel the others
+        dispatched = [message for message in messages if message.type in handlers]
+        results = await asyncio.gather(
+            *[handlers[message.type](message) for message in dispatched],
+            return_exceptions=True
+        )
+        
+        for message, result in zip(dispatched, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Error handling {message.type} message: {result}")
                 
     async def handle_shutdown_command(self, message):
         """Handle emergency shutdown command"""
@@ -132,6 +185,7 @@ class VoiceGuardService(win32serviceutil.ServiceFramework):
         self.event_logger.log_security_event(2002, 
             f"System Shutdown Initiated - Command: {command_data['command']}, "
             f"Confidence: {command_data['confidence']}")
+        self.notify_tray({'last_command_time': datetime.now()})
         
         # Check if in test mode
         if self.config_manager.get_setting("test_mode", False):
@@ -174,6 +228,7 @@ class VoiceGuardService(win32serviceutil.ServiceFramework):
         """Handle status update from helper process"""
         status_data = message.payload
         self.logger.debug(f"Status update received: {status_data}")
+        self.notify_tray({'helper_running': True})
         
     async def handle_config_change(self, message):
         """Handle configuration change notification"""
@@ -5,13 +5,18 @@ Multi-layer watchdog system for VoiceGuard reliability
 """
 
 import asyncio
+import ctypes
 import psutil
 import win32service
 import win32serviceutil
 import threading
 import logging
 import time
+import socket
+import select
+import sqlite3
 import subprocess
+from pathlib import Path
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional
 import json
@@ -23,6 +28,22 @@ except ImportError:
     DEPENDENCY_VALIDATION_AVAILABLE = False
 
 
+# Network probe target, DNS cache lifetime and retry window bounds (seconds)
+_NET_PROBE_ADDRESS = ('openrouter.ai', 443)
+_NET_DNS_TTL = 300
+_NET_BACKOFF_MIN = 30
+_NET_BACKOFF_MAX = 300
+
+# Seconds a disk usage reading is reused; disk fill changes slowly
+_DISK_USAGE_TTL = 300
+
+# Configuration database probed by the health monitor
+_CONFIG_DB_PATH = Path("C:/ProgramData/VoiceGuard/config.db")
+
+# Longest wait for the service to reach STOPPED during a restart (seconds)
+_SERVICE_STOP_TIMEOUT = 30
+
+
 class WatchdogManager:
     """Multi-layer watchdog system for VoiceGuard reliability"""
     
@@ -45,8 +66,12 @@ class WatchdogManager:
         self.failure_counts = {}
         self.recovery_attempts = {}
         
-    def start(self):
-        """Start the watchdog system"""
+        # Event loop recoveries are scheduled on; the watchdog thread has none
+        self._loop = None
+        
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start the watchdog system, running recoveries on the given event loop"""
+        self._loop = loop
         self.is_running = True
         self.watchdog_thread = threading.Thread(target=self._watchdog_loop, daemon=True)
         self.watchdog_thread.start()
@@ -134,10 +159,14 @@ class WatchdogManager:
             # Persistent failures - system-level recovery
             recovery_action = 'restart_system'
             
-        # Execute recovery
-        asyncio.create_task(self.recovery_manager.execute_recovery(
+        # Execute recovery on the service loop; this runs in the watchdog thread
+        if self._loop is None or self._loop.is_closed():
+            self.logger.error(f"No event loop available for recovery of {component}")
+            return
+            
+        asyncio.run_coroutine_threadsafe(self.recovery_manager.execute_recovery(
             component, recovery_action, status
-        ))
+        ), self._loop)
 
 
 class ServiceWatchdog:
@@ -186,29 +215,66 @@ class ProcessWatchdog:
             "VoiceGuardHelper.exe"
         ]
         
+        # Monitored processes by name, kept while they stay alive
+        self._proc_cache: Dict[str, psutil.Process] = {}
+        
+    def _cached_process(self, process_name: str) -> Optional[psutil.Process]:
+        """Return the cached process if it is still the one we monitor"""
+        process = self._proc_cache.get(process_name)
+        if process is None:
+            return None
+            
+        try:
+            if process.is_running() and process.name() == process_name:
+                return process
+        except psutil.Error:
+            pass
+            
+        del self._proc_cache[process_name]
+        return None
+        
+    def _find_processes(self, process_names: set):
+        """Locate uncached processes with one name-only scan"""
+        for process in psutil.process_iter(['name']):
+            name = process.info['name']
+            if name in process_names and name not in self._proc_cache:
+                try:
+                    # Prime the CPU counter so the next reading covers a full tick
+                    process.cpu_percent(interval=None)
+                except psutil.Error:
+                    continue
+                self._proc_cache[name] = process
+                
     def check_health(self) -> Dict:
         """Check process health"""
         try:
             process_status = {}
             
+            missing = {name for name in self.monitored_processes if self._cached_process(name) is None}
+            if missing:
+                self._find_processes(missing)
+                
             for process_name in self.monitored_processes:
-                processes = [p for p in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_info']) 
-                           if p.info['name'] == process_name]
+                process = self._proc_cache.get(process_name)
                 
-                if processes:
-                    process = processes[0]
-                    
-                    # Check CPU usage
-                    cpu_percent = process.info['cpu_percent']
-                    memory_mb = process.info['memory_info'].rss / 1024 / 1024
-                    
+                if process:
+                    try:
+                        # Check CPU usage
+                        cpu_percent = process.cpu_percent(interval=None)
+                        memory_mb = process.memory_info().rss / 1024 / 1024
+                    except psutil.Error:
+                        # Exited since the lookup; rescan next tick
+                        del self._proc_cache[process_name]
+                        process = None
+                        
+                if process:
                     # Health thresholds
                     cpu_healthy = cpu_percent < 50  # Less than 50% CPU
                     memory_healthy = memory_mb < 1024  # Less than 1GB memory
                     
                     process_status[process_name] = {
                         'running': True,
-                        'pid': process.info['pid'],
+                        'pid': process.pid,
                         'cpu_percent': cpu_percent,
                         'memory_mb': memory_mb,
                         'cpu_healthy': cpu_healthy,
@@ -243,13 +309,25 @@ class SystemWatchdog:
     def __init__(self):
         self.logger = logging.getLogger("SystemWatchdog")
         
+        # Network probe state: (sockaddr, expiry), retry window and last result
+        self._dns_cache = None
+        self._net_backoff = _NET_BACKOFF_MIN
+        self._next_net_probe = 0.0
+        self._network_healthy = False
+        
+        # Prime the CPU counter so each tick reads usage since the previous one
+        psutil.cpu_percent(interval=None)
+        
+        # (disk usage, monotonic time read)
+        self._disk_cache = None
+        
     def check_health(self) -> Dict:
         """Check system health"""
         try:
             # System resource checks
-            cpu_percent = psutil.cpu_percent(interval=1)
+            cpu_percent = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('C:')
+            disk = self._disk_usage()
             
             # Health thresholds
             cpu_healthy = cpu_percent < 80
@@ -285,35 +363,56 @@ class SystemWatchdog:
                 'error': str(e)
             }
             
+    def _disk_usage(self):
+        """Return system drive usage, re-read at most every five minutes"""
+        now = time.monotonic()
+        if self._disk_cache is None or now - self._disk_cache[1] >= _DISK_USAGE_TTL:
+            self._disk_cache = (psutil.disk_usage('C:'), now)
+        return self._disk_cache[0]
+        
     def _check_microphone_access(self) -> bool:
         """Check if microphone is accessible"""
         try:
-            import pyaudio
-            audio = pyaudio.PyAudio()
-            
-            # Try to get default input device
-            default_device = audio.get_default_input_device_info()
-            audio.terminate()
-            
-            return default_device is not None
+            # A single WinMM count reflects device changes without initializing
+            # PortAudio (and its COM objects) next to the capturing helper
+            return ctypes.windll.winmm.waveInGetNumDevs() > 0
             
         except Exception:
             return False
             
     def _check_network_connectivity(self) -> bool:
         """Check network connectivity to OpenRouter.ai"""
-        try:
-            import socket
+        now = time.monotonic()
+        if now < self._next_net_probe:
+            return self._network_healthy
             
-            # Try to connect to OpenRouter.ai
+        self._network_healthy = self._probe_network(now)
+        if self._network_healthy:
+            self._net_backoff = _NET_BACKOFF_MIN
+        else:
+            self._net_backoff = min(self._net_backoff * 2, _NET_BACKOFF_MAX)
+        self._next_net_probe = now + self._net_backoff
+        return self._network_healthy
+        
+    def _probe_network(self, now: float) -> bool:
+        """Attempt a bounded non-blocking connect to OpenRouter.ai"""
+        try:
+            if self._dns_cache is None or now >= self._dns_cache[1]:
+                addr_info = socket.getaddrinfo(*_NET_PROBE_ADDRESS, socket.AF_INET, socket.SOCK_STREAM)
+                self._dns_cache = (addr_info[0][4], now + _NET_DNS_TTL)
+                
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)
-            result = sock.connect_ex(('openrouter.ai', 443))
-            sock.close()
-            
-            return result == 0
-            
+            try:
+                sock.setblocking(False)
+                sock.connect_ex(self._dns_cache[0])
+                _, writable, _ = select.select([], [sock], [], 0.5)
+                return bool(writable) and sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0
+            finally:
+                sock.close()
+                
         except Exception:
+            # Resolve again on the next probe in case the address changed
+            self._dns_cache = None
             return False
 
 
@@ -323,6 +422,9 @@ class HealthMonitor:
     def __init__(self):
         self.logger = logging.getLogger("HealthMonitor")
         
+        # Read-only configuration database connection, opened once it exists
+        self._config_conn = None
+        
     def check_health(self) -> Dict:
         """Check application-specific health"""
         try:
@@ -353,20 +455,24 @@ class HealthMonitor:
     def _check_config_database(self) -> bool:
         """Check configuration database accessibility"""
         try:
-            from pathlib import Path
-            import sqlite3
-            
-            db_path = Path("C:/ProgramData/VoiceGuard/config.db")
-            if not db_path.exists():
-                return False
-                
-            # Try to connect and query
-            with sqlite3.connect(db_path) as conn:
-                cursor = conn.execute("SELECT COUNT(*) FROM settings")
-                cursor.fetchone()
+            if self._config_conn is None:
+                if not _CONFIG_DB_PATH.exists():
+                    return False
+                self._config_conn = sqlite3.connect(
+                    f"file:{_CONFIG_DB_PATH.as_posix()}?mode=ro", uri=True, check_same_thread=False
+                )
+                self._config_conn.execute("PRAGMA cache_size=-2000")
                 
+            # Touches one page of the settings table instead of counting it
+            self._config_conn.execute("SELECT 1 FROM settings LIMIT 1").fetchone()
             return True
             
+        except sqlite3.Error:
+            # Reopen on the next check
+            if self._config_conn is not None:
+                self._config_conn.close()
+                self._config_conn = None
+            return False
         except Exception:
             return False
             
@@ -384,27 +490,17 @@ class HealthMonitor:
     def _check_ipc_communication(self) -> bool:
         """Check IPC communication health"""
         try:
-            import win32file
+            import win32pipe
             
-            # Try to check if named pipe exists
+            # Check that a pipe instance is listening without connecting to it;
+            # opening the pipe would take an instance and wake the IPC server.
+            # A timeout of 0 means the server's default wait, so use 1 ms.
             pipe_name = r'\\.\pipe\VoiceGuardIPC'
+            win32pipe.WaitNamedPipe(pipe_name, 1)
+            return True
             
-            try:
-                handle = win32file.CreateFile(
-                    pipe_name,
-                    win32file.GENERIC_READ,
-                    0,
-                    None,
-                    win32file.OPEN_EXISTING,
-                    0,
-                    None
-                )
-                win32file.CloseHandle(handle)
-                return True
-            except:
-                return False
-                
         except Exception:
+            # Missing pipe, busy instances (ERROR_SEM_TIMEOUT) or no pywin32
             return False
 
 
@@ -413,6 +509,7 @@ class RecoveryManager:
     
     def __init__(self):
         self.logger = logging.getLogger("RecoveryManager")
+        self.service_name = "VoiceGuardService"
         
     async def execute_recovery(self, component: str, action: str, context: Dict):
         """Execute recovery action for failed component"""
@@ -445,22 +542,30 @@ class RecoveryManager:
     async def _restart_service(self):
         """Restart VoiceGuard service"""
         try:
-            # Stop service
-            subprocess.run(['sc', 'stop', 'VoiceGuardService'], 
-                         check=False, capture_output=True)
-            
-            # Wait a moment
-            await asyncio.sleep(5)
-            
-            # Start service
-            subprocess.run(['sc', 'start', 'VoiceGuardService'], 
-                         check=True, capture_output=True)
+            # SCM calls and the stop wait block, so keep them off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self._restart_service_blocking)
             
             self.logger.info("Service restarted successfully")
             
         except Exception as e:
             self.logger.error(f"Service restart failed: {e}")
             
+    def _restart_service_blocking(self):
+        """Stop the service, wait until it reports STOPPED, then start it"""
+        try:
+            win32serviceutil.StopService(self.service_name)
+        except Exception as e:
+            # Already stopped or stopping; the wait below settles it
+            self.logger.debug(f"Service stop request failed: {e}")
+            
+        deadline = time.monotonic() + _SERVICE_STOP_TIMEOUT
+        while win32serviceutil.QueryServiceStatus(self.service_name)[1] != win32service.SERVICE_STOPPED:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Service did not stop within {_SERVICE_STOP_TIMEOUT} seconds")
+            time.sleep(0.1)
+            
+        win32serviceutil.StartService(self.service_name)
+            
     async def _restart_system(self):
         """Restart the entire system (last resort)"""
         self.logger.critical("Initiating system restart due to persistent failures")
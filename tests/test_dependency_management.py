@@ -80,8 +80,7 @@ class TestDependencyManager:
                 assert isinstance(versions[package], str)
                 assert len(versions[package]) > 0
                 
-    @patch('requests.get')
-    def test_get_latest_versions_success(self, mock_get):
+    def test_get_latest_versions_success(self):
         """Test successful version fetching from PyPI"""
         # Mock PyPI response
         mock_response = Mock()
@@ -89,24 +88,23 @@ class TestDependencyManager:
         mock_response.json.return_value = {
             'info': {'version': '1.2.3'}
         }
-        mock_get.return_value = mock_response
         
         packages = ['test-package']
-        versions = self.manager.get_latest_versions(packages)
+        with patch.object(self.manager._http, 'get', return_value=mock_response):
+            versions = self.manager.get_latest_versions(packages)
         
         assert 'test-package' in versions
         assert versions['test-package'] == '1.2.3'
         
-    @patch('requests.get')
-    def test_get_latest_versions_failure(self, mock_get):
+    def test_get_latest_versions_failure(self):
         """Test handling of PyPI fetch failures"""
         # Mock failed response
         mock_response = Mock()
         mock_response.status_code = 404
-        mock_get.return_value = mock_response
         
         packages = ['nonexistent-package']
-        versions = self.manager.get_latest_versions(packages)
+        with patch.object(self.manager._http, 'get', return_value=mock_response):
+            versions = self.manager.get_latest_versions(packages)
         
         assert 'nonexistent-package' in versions
         assert versions['nonexistent-package'] is None
@@ -139,7 +137,32 @@ class TestDependencyManager:
                 
         finally:
             self.manager.project_root = original_root
-            
+
+    def test_backup_survives_requirements_update(self):
+        """Test that updating requirements never rewrites an existing backup"""
+        req_file = Path(self.temp_dir) / "requirements.txt"
+        with open(req_file, 'w') as f:
+            f.write("numpy>=1.20.0\n")
+
+        original_root = self.manager.project_root
+        self.manager.project_root = Path(self.temp_dir)
+
+        try:
+            backup_path = self.manager.backup_current_configuration()
+            self.manager.update_requirements_files({'numpy': '1.26.4'}, backup_path)
+
+            with open(backup_path / "requirements.txt", 'r') as f:
+                assert f.read() == "numpy>=1.20.0\n"
+            with open(req_file, 'r') as f:
+                assert f.read() == "numpy>=1.26.4\n"
+
+            assert self.manager.rollback_to_backup(backup_path) is True
+            with open(req_file, 'r') as f:
+                assert f.read() == "numpy>=1.20.0\n"
+
+        finally:
+            self.manager.project_root = original_root
+
     def test_parse_requirements_file(self):
         """Test requirements file parsing"""
         # Create test requirements file
@@ -159,6 +182,38 @@ pyaudio==0.2.11
         expected_packages = ['numpy>=1.20.0', 'scipy>=1.7.0', 'pyaudio==0.2.11']
         assert packages == expected_packages
         
+    def test_update_single_requirements_file(self):
+        """Test requirements file version updates"""
+        req_file = Path(self.temp_dir) / "requirements.txt"
+        with open(req_file, 'w') as f:
+            f.write("# Core\nnumpy>=1.20.0\nSciPy==1.7.0\nsqlite3  # Built in\nrequests\n")
+
+        changed = self.manager._update_single_requirements_file(
+            req_file, {'numpy': '1.26.4', 'scipy': '1.13.1'}
+        )
+        assert changed is True
+
+        with open(req_file, 'r') as f:
+            content = f.read()
+
+        assert content == "# Core\nnumpy>=1.26.4\nSciPy>=1.13.1\nsqlite3  # Built in\nrequests\n"
+
+        # No matching packages - file is left untouched
+        assert self.manager._update_single_requirements_file(req_file, {'pyaudio': '0.2.14'}) is False
+
+    def test_update_requirements_with_spaced_specifier(self):
+        """Test that whitespace before the version operator is accepted"""
+        req_file = Path(self.temp_dir) / "requirements.txt"
+        with open(req_file, 'w') as f:
+            f.write("numpy >= 1.20\nscipy  ==1.7.0\n")
+
+        assert self.manager._update_single_requirements_file(
+            req_file, {'numpy': '1.26.4', 'scipy': '1.13.1'}
+        ) is True
+
+        with open(req_file, 'r') as f:
+            assert f.read() == "numpy>=1.26.4\nscipy>=1.13.1\n"
+
     def test_warning_handler_setup(self):
         """Test warning handler is properly configured"""
         # The warning handler should be set up during initialization
@@ -183,6 +238,17 @@ pyaudio==0.2.11
             assert isinstance(validation_ok, bool)
             assert isinstance(issues, list)
             
+    def test_dependency_status_reuses_successful_validation(self):
+        """Test that a successful validation is cached for status reports"""
+        with patch.object(self.manager, 'validate_installation') as mock_validate:
+            mock_validate.return_value = (True, [])
+
+            self.manager.get_dependency_status()
+            status = self.manager.get_dependency_status()
+
+            assert mock_validate.call_count == 1
+            assert status['validation_status']['passed'] is True
+
     def test_emergency_fallback_mode(self):
         """Test emergency fallback mode activation"""
         success = self.manager.emergency_fallback_mode()
@@ -215,12 +281,19 @@ pyaudio==0.2.11
         # Create old backup directory
         old_backup = self.manager.backup_dir / "dependencies_backup_20240101_120000"
         old_backup.mkdir()
+        old_mtime = (datetime.now() - timedelta(days=40)).timestamp()
+        os.utime(old_backup, (old_mtime, old_mtime))
+        
+        # Recent backup should survive
+        recent_backup = self.manager.backup_dir / "dependencies_backup_recent"
+        recent_backup.mkdir()
         
         # Run cleanup
         self.manager.cleanup_old_data(days_to_keep=30)
         
         # Check that old data was cleaned
         assert not old_backup.exists()
+        assert recent_backup.exists()
         
         # Check warnings were cleaned
         if warnings_file.exists():
@@ -251,6 +324,25 @@ class TestDependencyValidator:
                 assert 'status' in results
                 assert results['status'] == 'validated'
                 
+    @pytest.mark.asyncio
+    async def test_service_startup_validation_is_cached(self):
+        """Test repeated service startup validation reuses the cached result"""
+        with patch.object(self.validator.dependency_manager, 'validate_installation') as mock_validate:
+            mock_validate.return_value = (True, [])
+            
+            with patch.object(self.validator.dependency_manager, 'check_system_compatibility') as mock_system:
+                mock_system.return_value = (True, [])
+                
+                first = await self.validator.validate_for_service_startup()
+                second = await self.validator.validate_for_service_startup()
+                
+                assert first == second
+                assert mock_validate.call_count == 1
+                
+                self.validator.clear_validation_cache()
+                await self.validator.validate_for_service_startup()
+                assert mock_validate.call_count == 2
+                
     def test_validate_for_gui_startup(self):
         """Test GUI startup validation"""
         with patch('PyQt6.QtWidgets'):
@@ -297,6 +389,16 @@ class TestDependencyValidator:
             assert 'dependency_status' in report
             assert 'recommendations' in report
             
+    def test_validation_recommendations_compare_versions_numerically(self):
+        """Test recommendations compare versions numerically, not as strings"""
+        status = {'system_info': {'python_version': '3.9.20'}, 'installed_packages': {}}
+        recommendations = self.validator._get_validation_recommendations(status)
+        assert any('Python 3.11+' in rec for rec in recommendations)
+        
+        status = {'system_info': {'python_version': '3.12.1'}, 'installed_packages': {}}
+        recommendations = self.validator._get_validation_recommendations(status)
+        assert not any('Python 3.11+' in rec for rec in recommendations)
+        
     def test_record_validation_result(self):
         """Test validation result recording"""
         # This should not raise an exception
@@ -307,8 +409,26 @@ class TestDependencyValidator:
         )
         
         # Check that history file would be created
-        history_file = self.validator.dependency_manager.cache_dir / "validation_history.json"
+        history_file = self.validator.dependency_manager.cache_dir / "validation_history.ndjson"
         # File may not exist in test environment, but method should not fail
+        
+    def test_validation_history_is_appended_and_compacted(self):
+        """Test validation history is kept as bounded NDJSON"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.validator.dependency_manager.cache_dir = Path(temp_dir)
+            history_file = Path(temp_dir) / "validation_history.ndjson"
+            
+            with patch('dependency_validator.VALIDATION_HISTORY_LIMIT', 5):
+                for i in range(12):
+                    self.validator.record_validation_result(f'component_{i}', True, {})
+                    
+            # Compacted to 5 records before the 11th write, then two more appended
+            assert len(history_file.read_text().splitlines()) == 7
+            
+            history = self.validator._get_validation_history()
+            assert [record['component'] for record in history] == [
+                f'component_{i}' for i in range(5, 12)
+            ]
 
 
 class TestDependencyIntegration:
@@ -352,7 +472,7 @@ class TestDependencyIntegration:
         manager = DependencyManager()
         
         # Test network failure recovery
-        with patch('requests.get') as mock_get:
+        with patch.object(manager._http, 'get') as mock_get:
             mock_get.side_effect = Exception("Network error")
             
             success, results = manager.automated_update_check()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for VoiceGuard Event Logger
+"""
+
+import pytest
+import io
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import os
+
+# Add src to path for testing
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from event_logger import JsonFormatter, TracebackQueueHandler
+
+
+class TestStructuredLogging:
+    """Test cases for the queued JSON log pipeline"""
+
+    def setup_method(self):
+        """Route a test logger through a queue to a JSON stream handler"""
+        self.stream = io.StringIO()
+        stream_handler = logging.StreamHandler(self.stream)
+        stream_handler.setFormatter(JsonFormatter())
+
+        log_queue = queue.Queue(-1)
+        self.listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        self.listener.start()
+
+        self.logger = logging.getLogger("TestStructuredLogging")
+        self.logger.propagate = False
+        self.queue_handler = TracebackQueueHandler(log_queue)
+        self.logger.addHandler(self.queue_handler)
+
+    def teardown_method(self):
+        """Stop the listener and detach the queue handler"""
+        self.listener.stop()
+        self.logger.removeHandler(self.queue_handler)
+
+    def read_entries(self):
+        """Drain the queue and parse every JSON line written so far"""
+        # Stopping the listener processes everything already queued
+        self.listener.stop()
+        self.listener.start()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_exception_survives_queue(self):
+        """Test that logger.exception output keeps its exception field"""
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            self.logger.exception("Operation %s failed", "sync")
+
+        entry = self.read_entries()[0]
+
+        assert entry['message'] == "Operation sync failed"
+        assert 'ValueError: boom' in entry['exception']
+        assert 'Traceback' not in entry['message']
+
+    @pytest.mark.parametrize('structured', [
+        {'category': 'security', 'event_id': 2002, 'message': 'Shutdown'},
+        {}
+    ])
+    def test_structured_json_is_valid(self, structured):
+        """Test that spliced structured payloads produce parseable JSON"""
+        record = logging.LogRecord("VoiceGuard", logging.WARNING, __file__, 1,
+                                   "Shutdown", None, None)
+        record.structured_data = structured
+        record.structured_json = json.dumps(structured, separators=(',', ':'))
+
+        output = JsonFormatter().format(record)
+        entry = json.loads(output)
+
+        assert entry['level'] == 'WARNING'
+        for key, value in structured.items():
+            assert entry[key] == value
+        assert ', ' not in output and '": ' not in output
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Tests for VoiceGuard OpenRouter Client
+"""
+
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add src to path for testing
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from openrouter_client import _float_to_int16, _float_to_int16_numpy
+
+
+class TestFloatToInt16:
+    """Test cases for float to int16 sample conversion"""
+
+    @pytest.mark.parametrize('dtype', [np.float32, np.float64])
+    def test_numba_and_numpy_paths_match(self, dtype):
+        """Test that both conversion paths give identical samples"""
+        rng = np.random.default_rng(0)
+        src = rng.uniform(-1.2, 1.2, 100000).astype(dtype)
+
+        fused = np.empty(src.size, dtype=np.int16)
+        fallback = np.empty(src.size, dtype=np.int16)
+        _float_to_int16(src, fused)
+        _float_to_int16_numpy(src, fallback)
+
+        assert np.array_equal(fused, fallback)
+
+    def test_clipping(self):
+        """Test that out-of-range samples are clipped"""
+        src = np.array([-2.0, -1.0, 0.0, 1.0, 2.0], dtype=np.float32)
+        dst = np.empty(src.size, dtype=np.int16)
+        _float_to_int16(src, dst)
+
+        assert dst.tolist() == [-32767, -32767, 0, 32767, 32767]